@@ -5,30 +5,27 @@ import os
 
 import click
 import uvicorn
-
-# A2A server imports
-from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
-from a2a.types import AgentCapabilities, AgentCard, AgentSkill
 from dotenv import load_dotenv
 
-# ADK imports
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-
-from agent import root_agent
-
-# Local agent imports
-from agent_executor import HostADKAgentExecutor
+# Only what is needed to start serving is imported here; ADK, LiteLLM and
+# the A2A server are imported by build_app() once the server is up.
+from server import build_app, create_agent_card
+from startup import AGENT_WORKERS, DeferredApp, import_report, run_workers
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Modules imported by build_app(), for --import-report.
+DEFERRED_IMPORTS = [
+    "a2a.server.apps",
+    "a2a.server.request_handlers",
+    "google.adk.runners",
+    "agent",
+    "agent_executor",
+]
+
 @click.command()
 @click.option(
     "--host",
@@ -45,68 +42,64 @@ load_dotenv()
     type=int,
     help="Port for the Host agent server.",
 )
-def main(host: str, port: int) -> None:
+@click.option(
+    "--workers",
+    "workers",
+    default=AGENT_WORKERS,
+    show_default=True,
+    type=int,
+    help=(
+        "Number of worker processes; more than one shares sessions through SQLite,"
+        " but cancel, resubscribe and file downloads need the worker running the task."
+    ),
+)
+@click.option(
+    "--import-report",
+    "report_imports",
+    is_flag=True,
+    help="Print the import time of the agent's dependencies and exit.",
+)
+@click.option(
+    "--trace-report",
+    "trace_files",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Print the critical path of the slowest requests in this span file "
+    "(TRACE_FILE of any service; repeatable) and exit.",
+)
+@click.option(
+    "--trace-id",
+    "trace_id",
+    default=None,
+    help="With --trace-report, report only this trace.",
+)
+def main(
+    host: str,
+    port: int,
+    workers: int,
+    report_imports: bool,
+    trace_files: tuple[str, ...],
+    trace_id: str | None,
+) -> None:
     """Runs the Host ADK agent as an A2A service."""
 
+    if report_imports:
+        click.echo(import_report(DEFERRED_IMPORTS))
+        return
+
+    if trace_files:
+        from trace_report import critical_path_report
+
+        click.echo(critical_path_report(trace_files, trace_id=trace_id))
+        return
+
     if not os.getenv("GOOGLE_API_KEY"):
         logger.warning(
             "GOOGLE_API_KEY environment variable not set. "
             "The Host agent might fail to initialize."
         )
 
-    orchestration_skill = AgentSkill(
-        id="orchestrate_ecommerce_agents",
-        name="Orchestrate E-commerce Intelligence Workflows",
-        description="Coordinates Price Scraper, Review Analyzer, and Stock Tracker agents to perform competitive intelligence tasks.",
-        tags=["orchestration", "workflow", "coordination", "multi-agent", "ecommerce"],
-        examples=[
-            "Find the current price, availability, and top review highlights for the Logitech MX Master 3 mouse.",
-            "Retrieve stock status and customer sentiment for the Kindle Paperwhite.",
-            "Compare prices and review summaries for three different external SSDs.",
-        ],
-    )
-
-    agent_card = AgentCard(
-        name="Host Agent Orchestrator",
-        description="Orchestrates Price Scraper, Review Analyzer, and Stock Tracker agents via A2A protocol for e-commerce competitive intelligence.",
-        url=f"http://{host}:{port}/",
-        version="1.0.0",
-        defaultInputModes=["text"],
-        defaultOutputModes=["text"],
-        capabilities=AgentCapabilities(streaming=False, pushNotifications=False),
-        skills=[orchestration_skill],
-    )
-
-    try:
-        # Create the actual ADK Agent
-        adk_agent = root_agent
-
-        # Initialize the ADK Runner (following official ADK pattern)
-        runner = Runner(
-            app_name=agent_card.name,
-            agent=adk_agent,
-            artifact_service=InMemoryArtifactService(),
-            session_service=InMemorySessionService(),
-            memory_service=InMemoryMemoryService(),
-        )
-
-        # Instantiate the AgentExecutor with the runner
-        agent_executor = HostADKAgentExecutor(
-            agent=adk_agent, agent_card=agent_card, runner=runner
-        )
-
-    except Exception as e:
-        logger.error(f"Failed to initialize Host Agent components: {e}", exc_info=True)
-        return
-    
-    request_handler = DefaultRequestHandler(
-        agent_executor=agent_executor, task_store=InMemoryTaskStore()
-    )
-
-    # Create the A2A Starlette application
-    a2a_app = A2AStarletteApplication(
-        agent_card=agent_card, http_handler=request_handler
-    )
+    agent_card = create_agent_card(host, port)
 
     logger.info(f"🌟 Starting Host Agent A2A Server on port {port}")
     logger.info(f"Agent Name: {agent_card.name}, Version: {agent_card.version}")
@@ -115,7 +108,12 @@ def main(host: str, port: int) -> None:
             logger.info(f"  Skill: {skill.name} (ID: {skill.id}, Tags: {skill.tags})")
 
     # Run the Uvicorn server
-    uvicorn.run(a2a_app.build(), host=host, port=port)
+    if workers > 1:
+        run_workers(host, port, workers)
+    else:
+        uvicorn.run(
+            DeferredApp(lambda: build_app(agent_card), agent_card), host=host, port=port
+        )
 
 
 if __name__ == "__main__":
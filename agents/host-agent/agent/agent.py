@@ -2,12 +2,11 @@ import asyncio
 import logging
 from typing import Any, Dict, Optional
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 from dotenv import load_dotenv
 import os
 # from tools import delegate_task_sync
 
-from a2a.client import A2AClient, A2ACardResolver
+from a2a.client import A2AClient, A2AClientHTTPError
 from uuid import uuid4
 from google.adk.tools.function_tool import FunctionTool
 from google.genai import types
@@ -17,10 +16,28 @@ from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
 from google.adk.sessions import InMemorySessionService
 from google.adk.agents.llm_agent import LlmAgent
 import httpx
+from opentelemetry.trace import SpanKind
+
+import metrics
+from agent_registry import AgentCardRegistry
+from history import compact_history
+from in_process import IN_PROCESS_AGENTS, local_agents
+from model_tiers import TierPolicy, tiered_llm
+from parallel_tools import ParallelToolCalls
+from tracing import inject_context, tracer
 from a2a.types import (
     AgentCard,
+    CancelTaskRequest,
+    DataPart,
+    Message,
     MessageSendParams,
-    SendStreamingMessageRequest
+    SendStreamingMessageRequest,
+    SendStreamingMessageResponse,
+    Task,
+    TaskArtifactUpdateEvent,
+    TaskIdParams,
+    TaskStatusUpdateEvent,
+    TextPart,
 )
 
 logger = logging.getLogger(__name__)
@@ -30,15 +47,18 @@ openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise ValueError("OPENAI_API_KEY is not loaded.")
 model_name = "gpt-4o-mini-2024-07-18"
+# Planning which agents to call needs the large model; relaying a single
+# agent's reply does not.
+tier_policy = TierPolicy(max_tool_calls=1)
 
 PRICE_A2A_SERVER_URL = os.getenv('PRICE_A2A_SERVER_URL')
-if not PRICE_A2A_SERVER_URL:
+if not PRICE_A2A_SERVER_URL and not IN_PROCESS_AGENTS:
     raise ValueError("PRICE_A2A_SERVER_URL is not loaded.")
 REVIEW_A2A_SERVER_URL = os.getenv('REVIEW_A2A_SERVER_URL')
-if not REVIEW_A2A_SERVER_URL:
+if not REVIEW_A2A_SERVER_URL and not IN_PROCESS_AGENTS:
     raise ValueError("REVIEW_A2A_SERVER_URL is not loaded.")
 STOCK_A2A_SERVER_URL = os.getenv('STOCK_A2A_SERVER_URL')
-if not STOCK_A2A_SERVER_URL:
+if not STOCK_A2A_SERVER_URL and not IN_PROCESS_AGENTS:
     raise ValueError("STOCK_A2A_SERVER_URL is not loaded.")
 
 AGENT_URL_MAP: Dict[str, str] = {
@@ -47,44 +67,21 @@ AGENT_URL_MAP: Dict[str, str] = {
     "stock_tracker_agent": STOCK_A2A_SERVER_URL
 }
 
+# The child agents' cards, fetched at startup and kept up to date.
+agent_registry = AgentCardRegistry(AGENT_URL_MAP.values())
+
 async def list_agents() -> list[AgentCard]:
     """
-    Fetch all AgentCard metadata from the registry,
-    return as a list of plain dicts.
+    Return the AgentCards of all child agents that could be reached,
+    from the registry.
     """
-    cards_data = []
-
-    async with httpx.AsyncClient() as httpx_client:
-        for agent_name, base_url in AGENT_URL_MAP.items():
-            logger.info(f"Initializing A2ACardResolver for {agent_name} at {base_url}.")
-            resolver = A2ACardResolver(
-                httpx_client=httpx_client,
-                base_url=base_url,
-            )
-
-            try:
-                logger.info(
-                    f"Attempting to fetch public agent card from: {base_url}"
-                )
-                public_card = await resolver.get_agent_card()
-                logger.info("Successfully fetched public agent card:")
-                logger.info(
-                    public_card.model_dump_json(indent=2, exclude_none=True)
-                )
-                print(f"Fetched agent '{public_card.name}' from registry at {base_url}")
-                cards_data.append(public_card)
+    return await agent_registry.cards()
 
-            except Exception as e:
-                logger.error(
-                    f"Critical error fetching public agent card from {base_url}: {e}",
-                    exc_info=True  
-                )
-                continue
-        
-        return cards_data
-    
 def create_send_message_payload(
-    text: str, task_id: str | None = None, context_id: str | None = None
+    text: str,
+    task_id: str | None = None,
+    context_id: str | None = None,
+    metadata: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     """Helper function to create the payload for sending a message."""
     payload: dict[str, Any] = {
@@ -100,46 +97,93 @@ def create_send_message_payload(
 
     if context_id:
         payload["message"]["contextId"] = context_id
+
+    if metadata:
+        payload["message"]["metadata"] = metadata
     return payload
 
-def print_json_response(response: Any) -> None:
-    """Helper function to print the JSON representation of a response."""
+def log_json_response(response: Any) -> None:
+    """Helper function to log the JSON representation of a response."""
     if hasattr(response, "root"):
-        print(f"{response.root.model_dump_json(exclude_none=True, indent=2)}\n")
+        logger.debug(response.root.model_dump_json(exclude_none=True, indent=2))
+    else:
+        logger.debug(response.model_dump_json(exclude_none=True, indent=2))
+
+def _answer_of(response: SendStreamingMessageResponse) -> Any:
+    """
+    Returns a child agent's answer from its last response: the data of its
+    `DataPart`, as validated by the child, or else its text.
+    """
+    error = getattr(response.root, "error", None)
+    if error is not None:
+        return f"Error: {error.message}"
+    result = response.root.result
+    if isinstance(result, TaskArtifactUpdateEvent):
+        parts = result.artifact.parts
+    elif isinstance(result, Task):
+        parts = [part for artifact in result.artifacts or [] for part in artifact.parts]
+    elif isinstance(result, TaskStatusUpdateEvent):
+        parts = result.status.message.parts if result.status.message else []
+    elif isinstance(result, Message):
+        parts = result.parts
     else:
-        print(f"{response.model_dump(mode='json', exclude_none=True, indent=2)}\n")
+        parts = []
+    data = [part.root.data for part in parts if isinstance(part.root, DataPart)]
+    if data:
+        return data[0] if len(data) == 1 else data
+    return "".join(part.root.text for part in parts if isinstance(part.root, TextPart))
+
+def _task_id_of(chunk: SendStreamingMessageResponse) -> Optional[str]:
+    """Returns the A2A task id a streaming response chunk belongs to, if any."""
+    result = getattr(chunk.root, "result", None)
+    if isinstance(result, Task):
+        return result.id
+    return getattr(result, "taskId", None)
 
-def get_text_from_json_response(response: Any) -> str:
+def _add_artifact_chunk(
+    answer: Optional[SendStreamingMessageResponse], chunk: SendStreamingMessageResponse
+) -> Optional[SendStreamingMessageResponse]:
     """
-    Extracts and returns the text content from a JSON response object.
+    Folds a streamed artifact chunk into `answer`, the chunk holding the
+    artifact so far. Appended text is merged into the last text part, so the
+    artifact reads as if it had been sent in one piece.
     """
+    result = getattr(chunk.root, "result", None)
+    if not isinstance(result, TaskArtifactUpdateEvent):
+        return answer
+    if not result.append or answer is None:
+        return chunk
+    parts = answer.root.result.artifact.parts
+    for part in result.artifact.parts:
+        if parts and isinstance(part.root, TextPart) and isinstance(parts[-1].root, TextPart):
+            parts[-1].root.text += part.root.text
+        else:
+            parts.append(part)
+    return answer
+
+async def cancel_child_task(agent_card: AgentCard, task_id: str) -> None:
+    """Asks a child agent to cancel a task started by `call_agent`."""
     try:
-        if hasattr(response, "model_dump"):
-            response = response.model_dump()
-        
-        text_content = response.get('result', {}).get('artifact', {}).get('parts', [{}])[0].get('text', '')
-        if text_content.startswith('```json'):
-            text_content = text_content.strip('`').strip('json').strip('\n`').strip()
-
-        return text_content
-        
-    except (TypeError, KeyError, IndexError) as e:
-        print(f"Error extracting text from response: {e}")
-        return ""
-    
+        async with httpx.AsyncClient(timeout=10.0) as httpx_client:
+            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
+            await client.cancel_task(
+                CancelTaskRequest(id=str(uuid4()), params=TaskIdParams(id=task_id))
+            )
+        logger.info(f"Cancelled task {task_id} on '{agent_card.name}'")
+    except Exception as e:
+        logger.warning(f"Could not cancel task {task_id} on '{agent_card.name}': {e}")
+
 async def call_agent(agent_name: str, task_description: str):
     """
     Given an agent_name string and a user message,
-    find that agent's URL, send the task, and return its reply.
+    find that agent's URL, send the task, and return its reply: the
+    structured data the agent answered with, or its text.
     """
-    cards = await list_agents()
-    target_card: Optional[AgentCard] = None
-
-    for card in cards:
-        if card.name == agent_name:
-            target_card = card
-            break
-    
+    local_agent = local_agents.get(agent_name)
+    if local_agent is not None:
+        return await local_agent.send(task_description)
+
+    target_card = await agent_registry.get(agent_name)
     if not target_card:
         logger.error(f"Agent '{agent_name}' not found.")
         return
@@ -151,40 +195,51 @@ async def call_agent(agent_name: str, task_description: str):
             httpx_client=httpx_client,
             agent_card=target_card
         )
-        print(f"Connected to A2AClient at: {target_card.url}")
-        send_message_payload = create_send_message_payload(text=task_description)
-        request = SendStreamingMessageRequest(
-            id=str(uuid4()), params=send_message_payload
-        )
+        logger.debug(f"Connected to A2AClient at: {target_card.url}")
         response_stream = []
-        try:
-            async for chunk in client.send_message_streaming(request):
-                if chunk:
-                    response_stream.append(chunk)
-            return response_stream[-2]
-        except Exception as e:
-            logger.error(f"Error while calling agent '{agent_name}': {e}", exc_info=True)
-            return "No response"
-
-# async def main():
-#     agent_name = "Stock Tracker Agent"
-#     query = "Check for the availability of the product `B0DGHMNQ5Z` in Amazon."
-    
-#     print(f"--- Calling agent '{agent_name}' with query: '{query}' ---")
-#     response = await call_agent(agent_name, query)
-#     print(f"--- ✅ Response from {agent_name}: ---")
-#     print(get_text_from_json_response(response))
-
-# if __name__ == "__main__":
-#     asyncio.run(main())
-
-# Ask Stock Tracker Agent to check for the availability of the product `B0DGHMNQ5Z`` in Amazon.
+        answer = None
+        child_task_id = None
+        with tracer.start_as_current_span(
+            "a2a.send_message",
+            kind=SpanKind.CLIENT,
+            attributes={"a2a.agent": agent_name, "url": target_card.url},
+        ):
+            # The child continues this trace.
+            send_message_payload = create_send_message_payload(
+                text=task_description, metadata=inject_context()
+            )
+            request = SendStreamingMessageRequest(
+                id=str(uuid4()), params=send_message_payload
+            )
+            try:
+                async for chunk in client.send_message_streaming(request):
+                    if chunk:
+                        child_task_id = child_task_id or _task_id_of(chunk)
+                        answer = _add_artifact_chunk(answer, chunk)
+                        response_stream.append(chunk)
+                return _answer_of(answer or response_stream[-2])
+            except asyncio.CancelledError:
+                # The host task was cancelled: stop the child's work as well. The
+                # request is shielded so a repeated cancel can't interrupt it.
+                if child_task_id:
+                    await asyncio.shield(cancel_child_task(target_card, child_task_id))
+                raise
+            except (A2AClientHTTPError, httpx.TransportError) as e:
+                # The agent may be down or have moved: fetch its card again
+                # when it is next called.
+                agent_registry.invalidate(agent_name)
+                logger.error(f"Could not reach agent '{agent_name}': {e}")
+                return "No response"
+            except Exception as e:
+                logger.error(f"Error while calling agent '{agent_name}': {e}", exc_info=True)
+                return "No response"
 
 system_instr = (
     "You are a root orchestrator agent and you can ask various agent based on the user request. You have two tools:\n"
     "1) list_agents() → Use this tool to see a list of all available agents and their capabilities.\n"
     "2) call_agent(agent_name: str, message: str) → Use this tool to send a message to a specific agent by its name and get its response.\n"
     "Use these tools to fulfill user requests by discovering and interacting with other agents as needed.\n"
+    "Agents answer with JSON data; answer the user from its fields, combining the data of all agents called into one reply.\n"
 )
 
 system_prompt = """
@@ -226,15 +281,23 @@ call_agent(agent_name: str, task_description: str)
 -   `task_description` (required): A clear, comprehensive, and standalone instruction for the child agent. While you have access to the full conversation history, the child agents do not. Therefore, you **must** provide all necessary context from our conversation in this description.
 """
 
+tools = [
+    # FunctionTool(list_agents),
+    FunctionTool(call_agent)
+]
+parallel_tools = ParallelToolCalls(tools)
+
 agent = LlmAgent(
     name="host_agent_orchestrator",
     description="A master orchestrator that delegates tasks to specialized child agents (Price Scraper Agent, Review Analyser Agent, Stock Tracker Agent) using a generic A2A communication tool.",
     instruction=system_instr,
-    tools=[
-        # FunctionTool(list_agents),
-        FunctionTool(call_agent)
-    ],
-    model=LiteLlm(model=model_name)
+    tools=tools,
+    model=tiered_llm(model_name, tier_policy),
+    before_model_callback=[compact_history, metrics.before_model_callback],
+    after_model_callback=[metrics.after_model_callback, parallel_tools.after_model_callback],
+    # Calls run in parallel are timed where they run and skip the metrics callback.
+    before_tool_callback=[parallel_tools.before_tool_callback, metrics.before_tool_callback],
+    after_tool_callback=metrics.after_tool_callback,
 )
 
 root_agent = agent
\ No newline at end of file
@@ -1,38 +1,52 @@
 """Host Agent Executor for A2A integration."""
 
-import datetime
+import asyncio
 import logging
+import os
 import uuid
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
-from a2a.types import (
-    AgentCard,
-    TaskState,
-    TaskStatus,
-    TaskStatusUpdateEvent,
-)
-from a2a.utils import new_agent_text_message
+from a2a.server.tasks import TaskUpdater
+from a2a.types import AgentCard, Part, TaskNotCancelableError, TaskState, TextPart
+from a2a.utils.errors import ServerError
 from google.adk.agents import Agent
 from google.adk.runners import Runner
 from google.adk.sessions import Session as ADKSession
 from google.genai import types as adk_types
+from opentelemetry.trace import SpanKind
+
+from admission import AdmissionController
+from artifact_stream import ArtifactStream, streaming_run_config
+from task_store import TERMINAL_STATES
+from tracing import extract_context, tracer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How long cancel() waits for a run to stop, which includes cancelling the
+# child-agent tasks it started.
+CANCEL_TIMEOUT = float(os.getenv("CANCEL_TIMEOUT", 10))
+
 
 class HostADKAgentExecutor(AgentExecutor):
     """ADK Agent Executor for Host A2A integration."""
 
-    def __init__(self, agent: Agent, agent_card: AgentCard, runner: Runner):
+    def __init__(
+        self,
+        agent: Agent,
+        agent_card: AgentCard,
+        runner: Runner,
+        admission: AdmissionController | None = None,
+    ):
         """Initialize with an Agent instance and provided ADK Runner.
 
         Args:
             agent: The Host ADK agent instance
             agent_card: Agent card for A2A service registration
             runner: Pre-configured ADK Runner instance
+            admission: Limits on concurrent and queued executions
         """
         logger.info(f"Initializing HostADKAgentExecutor for agent: {agent.name}")
         self.agent = agent
@@ -42,6 +56,9 @@ class HostADKAgentExecutor(AgentExecutor):
         # Get services from the provided runner
         self.session_service = runner.session_service
         self.artifact_service = runner.artifact_service
+        # Running orchestrations by A2A task id, so they can be cancelled.
+        self._running_tasks: dict[str, asyncio.Task] = {}
+        self._admission = admission or AdmissionController()
 
         logger.info(
             f"ADK Runner accepted for app '{self.runner.app_name}' for agent '{self.agent.name}'"
@@ -54,19 +71,56 @@ class HostADKAgentExecutor(AgentExecutor):
             context: The A2A request context containing user input
             event_queue: Queue for sending events back to the A2A client
         """
+        # The request continues the caller's trace, if it sent one; the wait
+        # for a slot is part of it.
+        with tracer.start_as_current_span(
+            "a2a.execute",
+            context=extract_context(context.message.metadata if context.message else None),
+            kind=SpanKind.SERVER,
+            attributes={"a2a.agent": self._card.name, "a2a.task_id": context.task_id},
+        ):
+            # Wait for an execution slot, or reject the request before a task
+            # is created for it if the host is overloaded.
+            async with self._admission.slot():
+                await self._execute(context, event_queue)
+
+    async def _execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        """Run the request once it has an execution slot."""
+        updater = TaskUpdater(event_queue, context.task_id, context.context_id)
+        if not context.current_task:
+            await updater.submit()
+        await updater.start_work()
+
+        # Run the orchestration in its own task so that cancel() can stop it,
+        # together with the child-agent calls it is waiting on.
+        run = asyncio.create_task(self._orchestrate(context, updater))
+        self._running_tasks[context.task_id] = run
+        try:
+            await run
+        except asyncio.CancelledError:
+            run.cancel()
+            logger.info(f"Host orchestration task {context.task_id} was cancelled")
+            if asyncio.current_task().cancelling():
+                raise
+        finally:
+            self._running_tasks.pop(context.task_id, None)
+
+    async def _orchestrate(self, context: RequestContext, updater: TaskUpdater) -> None:
+        """Run the Host agent for the request and report the outcome."""
         try:
             user_input = self._prepare_input(context)
             user_id, session_id = self._get_session_identifiers(context)
 
             await self._ensure_adk_session(user_id, session_id)
+            answer = ArtifactStream(updater)
             final_message_text = await self._run_agent_and_get_response(
-                user_input, user_id, session_id
+                user_input, user_id, session_id, answer
             )
 
-            self._send_response(event_queue, context, final_message_text)
+            await self._send_response(updater, context, final_message_text, answer)
 
         except Exception as e:
-            self._handle_error(e, event_queue, context)
+            await self._handle_error(e, updater, context)
 
     def _prepare_input(self, context: RequestContext) -> str:
         """Prepare and validate user input."""
@@ -117,22 +171,33 @@ class HostADKAgentExecutor(AgentExecutor):
             )
 
     async def _run_agent_and_get_response(
-        self, user_input: str, user_id: str, session_id: str
+        self, user_input: str, user_id: str, session_id: str, answer: ArtifactStream
     ) -> str:
-        """Run the ADK agent and extract the final response."""
+        """Run the ADK agent, streaming its output to `answer`, and extract the final response."""
         request_content = adk_types.Content(
             role="user", parts=[adk_types.Part(text=user_input)]
         )
 
         logger.debug(f"Running ADK agent {self.agent.name} with session {session_id}")
         events_async = self.runner.run_async(
-            user_id=user_id, session_id=session_id, new_message=request_content
+            user_id=user_id,
+            session_id=session_id,
+            new_message=request_content,
+            run_config=streaming_run_config(),
         )
 
         final_message_text = "(No orchestration result)"
 
         async for event in events_async:
-            if (
+            if event.partial:
+                if event.content and event.content.parts:
+                    await answer.write(
+                        "".join(part.text for part in event.content.parts if part.text)
+                    )
+            elif event.get_function_calls():
+                # Text streamed before a tool call is not the answer.
+                answer.discard()
+            elif (
                 event.is_final_response()
                 and event.content
                 and event.content.role == "model"
@@ -142,7 +207,8 @@ class HostADKAgentExecutor(AgentExecutor):
                     logger.info(
                         f"{self.agent.name} final response: '{final_message_text[:200]}{'...' if len(final_message_text) > 200 else ''}'"
                     )
-                    break
+                    # The run ends with this event. It is not left early:
+                    # ADK ends its spans as its generators finish.
                 else:
                     logger.warning(
                         f"{self.agent.name} received final event but no text in first part: {event.content.parts}"
@@ -154,21 +220,20 @@ class HostADKAgentExecutor(AgentExecutor):
 
         return final_message_text
 
-    def _send_response(
-        self, event_queue: EventQueue, context: RequestContext, message_text: str
+    async def _send_response(
+        self,
+        updater: TaskUpdater,
+        context: RequestContext,
+        message_text: str,
+        answer: ArtifactStream,
     ) -> None:
-        """Send the response back via the event queue."""
+        """Complete the task with the response as its answer artifact."""
         logger.info(f"Sending Host orchestration response for task {context.task_id}")
-        event_queue.enqueue_event(
-            new_agent_text_message(
-                text=message_text,
-                context_id=context.context_id,
-                task_id=context.task_id,
-            )
-        )
+        await answer.finish([Part(root=TextPart(text=message_text))])
+        await updater.complete()
 
-    def _handle_error(
-        self, error: Exception, event_queue: EventQueue, context: RequestContext
+    async def _handle_error(
+        self, error: Exception, updater: TaskUpdater, context: RequestContext
     ) -> None:
         """Handle errors and send error response."""
         logger.error(
@@ -176,32 +241,35 @@ class HostADKAgentExecutor(AgentExecutor):
             exc_info=True,
         )
         error_message_text = f"Error in orchestration workflow: {str(error)}"
-        event_queue.enqueue_event(
-            new_agent_text_message(
-                text=error_message_text,
-                context_id=context.context_id,
-                task_id=context.task_id,
-            )
+        await updater.failed(
+            message=updater.new_agent_message([Part(root=TextPart(text=error_message_text))])
         )
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
-        """Request the agent to cancel an ongoing task.
+        """Cancel an ongoing orchestration task.
+
+        Stops the ADK run; any child-agent task it is waiting on is cancelled
+        through its own A2A endpoint before the run finishes.
 
         Args:
             context: The A2A request context
             event_queue: Queue for sending cancellation events
         """
         task_id = context.task_id or "unknown_task"
-        context_id = context.context_id or "unknown_context"
         logger.info(
             f"Cancelling Host orchestration task: {task_id} for agent {self.agent.name}"
         )
 
-        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        if context.current_task and context.current_task.status.state in TERMINAL_STATES:
+            raise ServerError(error=TaskNotCancelableError())
 
-        canceled_status = TaskStatus(state=TaskState.canceled, timestamp=timestamp)
-        cancel_event = TaskStatusUpdateEvent(
-            taskId=task_id, contextId=context_id, status=canceled_status, final=True
-        )
-        event_queue.enqueue_event(cancel_event)
-        logger.info(f"Sent cancel event for Host task: {task_id}")
\ No newline at end of file
+        # Report the new state before stopping the run: execute() closes the
+        # task's event queue as soon as the run ends.
+        updater = TaskUpdater(event_queue, task_id, context.context_id)
+        await updater.update_status(TaskState.canceled, final=True)
+        logger.info(f"Sent cancel event for Host task: {task_id}")
+
+        run = self._running_tasks.pop(task_id, None)
+        if run is not None:
+            run.cancel()
+            await asyncio.wait({run}, timeout=CANCEL_TIMEOUT)
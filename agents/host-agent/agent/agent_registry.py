@@ -0,0 +1,162 @@
+"""
+The agent cards of the child agents, cached by the host.
+
+The cards are fetched concurrently when the host starts and used for
+AGENT_CARD_TTL seconds. A background task fetches them again before then,
+with a conditional request if the agent sent an ETag or Last-Modified
+header, so `call_agent` finds an agent's URL without an HTTP round trip.
+The card of an agent that could not be reached is dropped and fetched again
+when the agent is next called.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from a2a.types import AgentCard
+from opentelemetry.trace import SpanKind
+
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+AGENT_CARD_TTL = float(os.getenv("AGENT_CARD_TTL", 300))
+AGENT_CARD_PATH = "/.well-known/agent.json"
+
+
+@dataclass
+class _Entry:
+    card: AgentCard
+    base_url: str
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class AgentCardRegistry:
+    """
+    Agent cards by agent name, fetched from the agents' base URLs.
+
+    Args:
+        urls (Iterable[str | None]): Base URLs of the agents; empty ones
+            (agents running in process) are left out.
+        ttl (float): Seconds a card is used before it must be fetched again.
+    """
+
+    def __init__(self, urls: Iterable[Optional[str]], ttl: float = AGENT_CARD_TTL):
+        self.urls = [url for url in urls if url]
+        self.ttl = ttl
+        self._entries: dict[str, _Entry] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._rounds = 0
+
+    async def start(self) -> None:
+        """Fetches all cards and starts refreshing them in the background."""
+        await self.refresh()
+        if self._refresh_task is None and self.urls:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        """Stops the background refresh and closes the HTTP client."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, name: str) -> Optional[AgentCard]:
+        """The card of the agent called `name`, or None if no agent has that name."""
+        entry = self._entries.get(name)
+        if entry is None or self._expired(entry):
+            await self._fetch_missing()
+            entry = self._entries.get(name)
+        return entry.card if entry is not None else None
+
+    async def cards(self) -> list[AgentCard]:
+        """The cards of all agents that could be reached."""
+        await self._fetch_missing()
+        return [entry.card for entry in self._entries.values()]
+
+    def invalidate(self, name: str) -> None:
+        """Drops the card of the agent called `name`, e.g. after it could not be reached."""
+        if self._entries.pop(name, None) is not None:
+            logger.info("Dropped the agent card of '%s'", name)
+
+    async def refresh(self, urls: Optional[Iterable[str]] = None) -> None:
+        """Fetches the cards at `urls`, or of all agents, concurrently."""
+        urls = self.urls if urls is None else list(urls)
+        await asyncio.gather(*(self._fetch(url) for url in urls))
+        self._rounds += 1
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.fetched_at > self.ttl
+
+    async def _fetch_missing(self) -> None:
+        # Fetches the cards that are missing or expired; callers that miss
+        # at the same time wait for one round of fetches.
+        rounds = self._rounds
+        async with self._lock:
+            if self._rounds != rounds:
+                return
+            fresh = {entry.base_url for entry in self._entries.values() if not self._expired(entry)}
+            missing = [url for url in self.urls if url not in fresh]
+            if missing:
+                await self.refresh(missing)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            # Twice per TTL, so that cards are renewed before they expire.
+            await asyncio.sleep(self.ttl / 2)
+            await self.refresh()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient()
+        return self._client
+
+    async def _fetch(self, base_url: str) -> None:
+        entry = next((entry for entry in self._entries.values() if entry.base_url == base_url), None)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        with tracer.start_as_current_span(
+            "a2a.get_card", kind=SpanKind.CLIENT, attributes={"url": base_url}
+        ):
+            try:
+                response = await self._http().get(
+                    base_url.rstrip("/") + AGENT_CARD_PATH, headers=headers
+                )
+                if entry is not None and response.status_code == httpx.codes.NOT_MODIFIED:
+                    entry.fetched_at = time.monotonic()
+                    return
+                response.raise_for_status()
+                card = AgentCard.model_validate(response.json())
+            except Exception as e:
+                # A card that was fetched before stays in use until it expires.
+                logger.error("Could not fetch the agent card from %s: %s", base_url, e)
+                return
+        if entry is not None and entry.card.name != card.name:
+            self._entries.pop(entry.card.name, None)
+        if entry is None or entry.card != card:
+            logger.info("Fetched the agent card of '%s' from %s", card.name, base_url)
+        self._entries[card.name] = _Entry(
+            card,
+            base_url,
+            time.monotonic(),
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
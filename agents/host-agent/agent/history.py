@@ -0,0 +1,118 @@
+"""Compaction of old tool outputs in the conversation sent to the LLM."""
+
+import json
+import os
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from metrics import HISTORY_COMPACTIONS
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 6000))
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", 400))
+# Items kept from each list of a compacted output.
+HISTORY_SUMMARY_ITEMS = int(os.getenv("HISTORY_SUMMARY_ITEMS", 3))
+
+# Roughly four characters per token for the JSON the model sees.
+_CHARS_PER_TOKEN = 4
+
+
+def _estimate_tokens(contents: list[types.Content]) -> int:
+    return sum(
+        len(content.model_dump_json(exclude_none=True)) for content in contents
+    ) // _CHARS_PER_TOKEN
+
+
+def current_turn_start(contents: list[types.Content]) -> int:
+    """Returns the index of the latest user message in `contents`."""
+    # Function responses are user contents too, so only text counts.
+    for index in range(len(contents) - 1, -1, -1):
+        content = contents[index]
+        if content.role == "user" and any(part.text for part in content.parts or []):
+            return index
+    return 0
+
+
+def _jsonable(value: Any) -> Any:
+    # Tool results can be pydantic models, e.g. the CallToolResult of MCP tools.
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return str(value)
+
+
+def _shrink(value: Any, items: int, chars: int, depth: int = 0) -> Any:
+    # A copy of `value` of the same shape, with lists cut to their first
+    # `items` items and strings to `chars` characters. JSON held in a string,
+    # as MCP tools return it, is shrunk as the structure it encodes.
+    if isinstance(value, str):
+        if len(value) > chars and value.lstrip()[:1] in ("{", "["):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+            else:
+                return _shrink(value, items, chars)
+        return value if len(value) <= chars else value[:chars] + "..."
+    if depth >= 4 and isinstance(value, (dict, list)):
+        return f"<{len(value)} {'keys' if isinstance(value, dict) else 'items'}>"
+    if isinstance(value, dict):
+        return {key: _shrink(item, items, chars, depth + 1) for key, item in value.items()}
+    if isinstance(value, list):
+        kept = [_shrink(item, items, chars, depth + 1) for item in value[:items]]
+        if len(value) > items:
+            kept.append(f"<{len(value) - items} more of {len(value)} items>")
+        return kept
+    return value
+
+
+def summarize(response: dict[str, Any], max_chars: int = HISTORY_SUMMARY_CHARS) -> Any:
+    """
+    A summary of a tool output of at most about `max_chars` characters.
+
+    The summary keeps the output's structure: all keys, the length and
+    first items of every list, and the start of every string. It gets
+    coarser until it fits, down to one item per list; an output with many
+    keys can stay larger.
+    """
+    data = json.loads(json.dumps(response, default=_jsonable))
+    items, chars = HISTORY_SUMMARY_ITEMS, max(max_chars // 4, 16)
+    while True:
+        summary = _shrink(data, items, chars)
+        if len(json.dumps(summary)) <= max_chars or (items == 1 and chars == 16):
+            return summary
+        items, chars = max(items - 1, 1), max(chars // 2, 16)
+
+
+async def compact_history(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """
+    Keeps the prompt under HISTORY_TOKEN_BUDGET tokens.
+
+    Once the request is over budget, tool outputs from earlier turns are
+    replaced, oldest first, with a `summarize`d version that keeps their
+    keys, list lengths and first items. Only the outgoing request is
+    changed: the session keeps the complete history, and the current turn
+    is left as is.
+    """
+    tokens = _estimate_tokens(llm_request.contents)
+    if tokens <= HISTORY_TOKEN_BUDGET:
+        return
+    for content in llm_request.contents[:current_turn_start(llm_request.contents)]:
+        for part in content.parts or []:
+            response = part.function_response
+            if response is None or response.response is None:
+                continue
+            body = json.dumps(response.response, default=_jsonable)
+            if len(body) <= 2 * HISTORY_SUMMARY_CHARS:
+                continue
+            response.response = {
+                "compacted": "Shortened: lists show their first items, strings their start.",
+                "summary": summarize(response.response),
+            }
+            HISTORY_COMPACTIONS.inc()
+            tokens -= (len(body) - len(json.dumps(response.response))) // _CHARS_PER_TOKEN
+            if tokens <= HISTORY_TOKEN_BUDGET:
+                return
@@ -0,0 +1,200 @@
+"""
+Runs the price, review and stock agents inside the host process.
+
+With IN_PROCESS_AGENTS set, the host loads the child agents from their
+directories under AGENTS_ROOT and `call_agent` hands tasks to their ADK
+runners directly, without an A2A round trip, on the host's event loop and
+with its LLM clients. Each child's A2A application is still mounted on the
+host under `/<agent-directory>/`, with its agent card at
+`/<agent-directory>/.well-known/agent.json`, for external callers.
+
+AGENTS_ROOT defaults to the directory above the host agent's, as in a
+checkout. The host's own image holds only the host; agents/in-process-host
+builds one with all four agents and their dependencies.
+
+Every child reads its MCP server from MCP_SERVER_URL; in one process the
+URLs are taken from PRICE_MCP_SERVER_URL, REVIEW_MCP_SERVER_URL and
+STOCK_MCP_SERVER_URL instead, falling back to each agent's default.
+
+A child runs at most as many tasks at once as over A2A: calls from the host
+take the same admission slots as the tasks of its mounted A2A app.
+"""
+
+import importlib.util
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Optional
+
+from a2a.server.apps import A2AFastAPIApplication
+from a2a.server.request_handlers import DefaultRequestHandler
+from a2a.server.tasks import TaskStore
+from a2a.types import AgentCard
+from a2a.utils.errors import ServerError
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.tools.mcp_tool import StreamableHTTPConnectionParams
+from google.genai import types
+from starlette.applications import Starlette
+from starlette.types import ASGIApp
+
+from admission import AdmissionController
+from session_service import create_session_service
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+IN_PROCESS_AGENTS = os.getenv("IN_PROCESS_AGENTS", "").lower() in ("1", "true")
+AGENTS_ROOT = os.getenv(
+    "AGENTS_ROOT",
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+)
+# Agent directory and the prefix of its MCP server URL variable.
+CHILD_AGENTS = {
+    "price-scraper-agent": "PRICE",
+    "review-analyser-agent": "REVIEW",
+    "stock-tracker-agent": "STOCK",
+}
+
+# The modules the host also has are the same in every agent directory, so
+# the children share the host's copies (and with them one metrics registry).
+# These are the same in every child but missing from the host; they are
+# loaded once, from the first child, under their own names, so that the
+# children's imports find them.
+_CHILD_MODULES = ("blob_store", "prerouter", "status_updates", "structured_output", "warm_toolset")
+# Loaded once per agent, under names of their own.
+_PER_AGENT_MODULES = ("agent", "agent_executor", "server")
+
+
+@dataclass
+class LocalAgent:
+    """A child agent running in the host process."""
+
+    card: AgentCard
+    runner: Runner
+    prerouter: Optional[Any]
+    toolset: Any
+    app: ASGIApp
+    admission: AdmissionController
+    output: Optional[Any] = None
+
+    async def send(self, text: str) -> Any:
+        """
+        Runs one task on the agent and returns its final answer, as data if
+        it matches the agent's schema, as over A2A.
+        """
+        with tracer.start_as_current_span("a2a.execute", attributes={"a2a.agent": self.card.name}):
+            try:
+                async with self.admission.slot():
+                    return await self._run(text)
+            except ServerError as e:
+                # As `call_agent` reports a busy agent over A2A.
+                return f"Error: {e.error.message}"
+
+    async def _run(self, text: str) -> Any:
+        if self.prerouter is not None:
+            answer = await self.prerouter.route(text)
+            if answer is not None:
+                return self._structure(answer)
+        # Every task gets a fresh session, as over A2A, and drops it after.
+        session = await self.runner.session_service.create_session(
+            app_name=self.runner.app_name, user_id="host"
+        )
+        try:
+            answer = ""
+            # The run is not left at the final response, so ADK's spans end.
+            async for event in self.runner.run_async(
+                user_id="host",
+                session_id=session.id,
+                new_message=types.UserContent(parts=[types.Part(text=text)]),
+            ):
+                if event.is_final_response():
+                    parts = event.content.parts if event.content else []
+                    answer = "".join(part.text for part in parts if part.text)
+            return self._structure(answer)
+        finally:
+            await self.runner.session_service.delete_session(
+                app_name=self.runner.app_name, user_id="host", session_id=session.id
+            )
+
+
+    def _structure(self, answer: str) -> Any:
+        data = self.output.parse(answer) if self.output is not None and answer else None
+        return answer if data is None else data
+
+
+# Loaded agents by agent card name, as used by `call_agent`.
+local_agents: dict[str, LocalAgent] = {}
+
+
+def _load_module(name: str, path: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered before it runs, as by an import, so that pydantic and
+    # dataclasses find the module of the classes it defines.
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def _agent_modules(directory: str) -> dict[str, ModuleType]:
+    # The modules of the child in `directory`, by their names there.
+    path = os.path.join(AGENTS_ROOT, directory, "agent")
+    for name in _CHILD_MODULES:
+        if name not in sys.modules:
+            _load_module(name, os.path.join(path, f"{name}.py"))
+    prefix = directory.replace("-", "_")
+    modules = {name: sys.modules[name] for name in _CHILD_MODULES}
+    for name in _PER_AGENT_MODULES:
+        modules[name] = _load_module(f"{prefix}_{name}", os.path.join(path, f"{name}.py"))
+    return modules
+
+
+def _load_agent(directory: str, host_card: AgentCard, task_store: TaskStore) -> LocalAgent:
+    modules = _agent_modules(directory)
+    server, agent, agent_executor = modules["server"], modules["agent"], modules["agent_executor"]
+
+    url = os.getenv(f"{CHILD_AGENTS[directory]}_MCP_SERVER_URL", agent.DEFAULT_MCP_SERVER_URL)
+    agent.toolset.set_connection_params(StreamableHTTPConnectionParams(url=url))
+    card = server.create_agent_card("localhost", 0)
+    card.url = f"{host_card.url.rstrip('/')}/{directory}/"
+    artifact_service = InMemoryArtifactService()
+    runner = Runner(
+        app_name=card.name,
+        agent=agent.root_agent,
+        artifact_service=artifact_service,
+        session_service=create_session_service(artifact_service),
+        memory_service=InMemoryMemoryService(),
+    )
+    prerouter = getattr(agent, "prerouter", None)
+    output = getattr(agent, "structured_output", None)
+    admission = AdmissionController()
+    executor = agent_executor.ADKAgentExecutor(
+        runner, card, prerouter=prerouter, admission=admission, output=output
+    )
+    request_handler = DefaultRequestHandler(agent_executor=executor, task_store=task_store)
+    app = A2AFastAPIApplication(agent_card=card, http_handler=request_handler).build()
+    modules["blob_store"].add_artifact_route(app, executor.blobs)
+    return LocalAgent(card, runner, prerouter, agent.toolset, app, admission, output)
+
+
+def add_local_agents(app: Starlette, host_card: AgentCard, task_store: TaskStore) -> None:
+    """
+    Loads the child agents into this process and mounts their A2A apps on
+    the host's `app`, sharing its task store.
+    """
+    for directory in CHILD_AGENTS:
+        local_agent = _load_agent(directory, host_card, task_store)
+        local_agents[local_agent.card.name] = local_agent
+        app.mount(f"/{directory}", local_agent.app)
+        # Mounted apps don't get startup and shutdown events of their own.
+        app.add_event_handler("startup", local_agent.toolset.start)
+        app.add_event_handler("shutdown", local_agent.toolset.close)
+        logger.info("Running '%s' in process at %s", local_agent.card.name, local_agent.card.url)
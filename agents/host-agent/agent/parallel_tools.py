@@ -0,0 +1,146 @@
+"""Concurrent execution of the tool calls an LLM response asks for."""
+
+import asyncio
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+import metrics
+from metrics import TOOL_BATCH_SIZE
+from tracing import parent_context, tracer
+
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", 4))
+# Batches of runs that stopped before handing out all results are dropped
+# once this many newer batches exist.
+MAX_BATCHES = 256
+
+
+@dataclass
+class _Batch:
+    # The calls of one LLM response by function call id, and once the first
+    # of them is reached, their running tasks.
+    calls: dict[str, types.FunctionCall]
+    tasks: Optional[dict[str, asyncio.Task]] = None
+
+    def cancel(self) -> None:
+        for task in (self.tasks or {}).values():
+            task.cancel()
+
+
+class ParallelToolCalls:
+    """
+    Runs all tool calls of an LLM response at once instead of one by one.
+
+    ADK runs the calls of a response in sequence and passes each through the
+    before-tool callbacks. `after_model_callback` notes the calls of every
+    response with several of them; when ADK reaches the first one,
+    `before_tool_callback` starts all of them, at most TOOL_MAX_CONCURRENCY
+    at a time, and then hands each call its result as ADK reaches it, so a
+    turn takes as long as its slowest call.
+
+    The calls run with the tool context of the first one. ADK merges the
+    responses of a turn into one event, so their state and artifact changes
+    end up in the same place as when run in sequence.
+
+    Args:
+        tools (list): The agent's tools and toolsets.
+        max_concurrency (int): Calls of one response running at once.
+    """
+
+    def __init__(
+        self,
+        tools: list[Union[BaseTool, BaseToolset]],
+        max_concurrency: int = TOOL_MAX_CONCURRENCY,
+    ):
+        self.tools = tools
+        self.max_concurrency = max_concurrency
+        # Batches by invocation id; an invocation has at most one at a time.
+        self._batches: OrderedDict[str, _Batch] = OrderedDict()
+
+    def after_model_callback(self, callback_context, llm_response) -> None:
+        """Notes the tool calls of a response that can run in parallel."""
+        if llm_response.partial:
+            return
+        self._drop(callback_context.invocation_id)
+        parts = llm_response.content.parts if llm_response.content else None
+        calls = [part.function_call for part in parts or [] if part.function_call]
+        # Calls are matched by id; ADK makes up ids only after this callback.
+        if len(calls) < 2 or not all(call.id for call in calls):
+            return
+        self._batches[callback_context.invocation_id] = _Batch({call.id: call for call in calls})
+        while len(self._batches) > MAX_BATCHES:
+            self._batches.popitem(last=False)[1].cancel()
+
+    async def before_tool_callback(
+        self, tool: BaseTool, args: dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        """Returns the result of a call run in parallel, or None to let ADK run it."""
+        invocation_id = tool_context.invocation_id
+        batch = self._batches.get(invocation_id)
+        if batch is None or tool_context.function_call_id not in batch.calls:
+            return None
+        if batch.tasks is None and not await self._start(batch, tool_context):
+            self._drop(invocation_id)
+            return None
+        task = batch.tasks.pop(tool_context.function_call_id, None)
+        if task is None:
+            return None
+        if not batch.tasks:
+            self._batches.pop(invocation_id, None)
+        try:
+            result = await task
+        except BaseException:
+            self._drop(invocation_id)
+            raise
+        # ADK treats an empty answer from a callback as "run the tool", and wraps
+        # anything but a dict the same way.
+        if not isinstance(result, dict) or not result:
+            result = {"result": result}
+        return result
+
+    def _drop(self, invocation_id: str) -> None:
+        batch = self._batches.pop(invocation_id, None)
+        if batch is not None:
+            batch.cancel()
+
+    async def _resolve(self, tool_context: ToolContext) -> dict[str, BaseTool]:
+        tools = {}
+        for tool in self.tools:
+            if isinstance(tool, BaseToolset):
+                tools.update((found.name, found) for found in await tool.get_tools(tool_context))
+            else:
+                tools[tool.name] = tool
+        return tools
+
+    async def _start(self, batch: _Batch, tool_context: ToolContext) -> bool:
+        tools = await self._resolve(tool_context)
+        calls = list(batch.calls.values())
+        if any(call.name not in tools or tools[call.name].is_long_running for call in calls):
+            return False
+
+        slots = asyncio.Semaphore(self.max_concurrency)
+        # The calls start from ADK's span for the first one, but run next to it.
+        trace_context = parent_context()
+
+        async def run(tool: BaseTool, call: types.FunctionCall) -> Any:
+            with tracer.start_as_current_span(f"execute_tool {tool.name} (parallel)", trace_context):
+                async with slots:
+                    # Timed from here: ADK's tool callbacks only see the call
+                    # when it hands out the result.
+                    metrics.tool_started(tool_context.agent_name, tool.name, call.id)
+                    try:
+                        return await tool.run_async(args=call.args or {}, tool_context=tool_context)
+                    finally:
+                        metrics.tool_finished(call.id)
+
+        batch.tasks = {
+            call.id: asyncio.create_task(run(tools[call.name], call)) for call in calls
+        }
+        TOOL_BATCH_SIZE.observe(len(calls))
+        return True
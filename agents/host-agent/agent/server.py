@@ -0,0 +1,106 @@
+"""Host Agent A2A application."""
+
+import os
+
+from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+from starlette.types import ASGIApp
+
+from startup import DeferredApp
+
+
+def create_agent_card(host: str, port: int) -> AgentCard:
+    """Describes the Host agent served at `host`:`port`."""
+    orchestration_skill = AgentSkill(
+        id="orchestrate_ecommerce_agents",
+        name="Orchestrate E-commerce Intelligence Workflows",
+        description="Coordinates Price Scraper, Review Analyzer, and Stock Tracker agents to perform competitive intelligence tasks.",
+        tags=["orchestration", "workflow", "coordination", "multi-agent", "ecommerce"],
+        examples=[
+            "Find the current price, availability, and top review highlights for the Logitech MX Master 3 mouse.",
+            "Retrieve stock status and customer sentiment for the Kindle Paperwhite.",
+            "Compare prices and review summaries for three different external SSDs.",
+        ],
+    )
+
+    return AgentCard(
+        name="Host Agent Orchestrator",
+        description="Orchestrates Price Scraper, Review Analyzer, and Stock Tracker agents via A2A protocol for e-commerce competitive intelligence.",
+        url=f"http://{host}:{port}/",
+        version="1.0.0",
+        defaultInputModes=["text"],
+        defaultOutputModes=["text"],
+        capabilities=AgentCapabilities(streaming=True, pushNotifications=False),
+        skills=[orchestration_skill],
+    )
+
+
+def build_app(agent_card: AgentCard) -> ASGIApp:
+    """Builds the A2A application; imports ADK, LiteLLM and the A2A server."""
+    # A2A server imports
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+
+    # ADK imports
+    from google.adk.artifacts import InMemoryArtifactService
+    from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+    from google.adk.runners import Runner
+
+    # Local agent imports
+    from agent import agent_registry, root_agent
+    from agent_executor import HostADKAgentExecutor
+    from in_process import IN_PROCESS_AGENTS, add_local_agents
+    from metrics import add_metrics_route, watch_stores
+    from session_service import create_session_service
+    from task_store import SqliteTaskStore
+    from tracing import setup_tracing
+
+    setup_tracing(agent_card.name)
+
+    # Create the actual ADK Agent
+    adk_agent = root_agent
+
+    # Initialize the ADK Runner (following official ADK pattern)
+    artifact_service = InMemoryArtifactService()
+    session_service = create_session_service(artifact_service)
+    runner = Runner(
+        app_name=agent_card.name,
+        agent=adk_agent,
+        artifact_service=artifact_service,
+        session_service=session_service,
+        memory_service=InMemoryMemoryService(),
+    )
+
+    # Instantiate the AgentExecutor with the runner
+    agent_executor = HostADKAgentExecutor(
+        agent=adk_agent, agent_card=agent_card, runner=runner
+    )
+
+    task_store = SqliteTaskStore()
+    request_handler = DefaultRequestHandler(
+        agent_executor=agent_executor, task_store=task_store
+    )
+
+    # Create the A2A Starlette application
+    a2a_app = A2AStarletteApplication(
+        agent_card=agent_card, http_handler=request_handler
+    )
+
+    app = a2a_app.build()
+    # Expose Prometheus metrics next to the A2A endpoints
+    add_metrics_route(app)
+    # Fetch the child agents' cards now and refresh them in the background.
+    app.add_event_handler("startup", agent_registry.start)
+    app.add_event_handler("shutdown", agent_registry.close)
+    if IN_PROCESS_AGENTS:
+        add_local_agents(app, agent_card, task_store)
+    watch_stores(session_service, task_store)
+    return app
+
+
+def create_app() -> DeferredApp:
+    """
+    Returns the application of one uvicorn worker, which is started from an
+    import string and finds its address in AGENT_HOST and AGENT_PORT.
+    """
+    agent_card = create_agent_card(os.environ["AGENT_HOST"], int(os.environ["AGENT_PORT"]))
+    return DeferredApp(lambda: build_app(agent_card), agent_card)
@@ -0,0 +1,133 @@
+"""Critical path of traced requests, from the span files written by `tracing`."""
+
+import json
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Spans ending within this many seconds of each other count as finishing together.
+SAME_END = 0.005
+
+
+@dataclass
+class Span:
+    """A finished span as read back from a span file."""
+
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    service: str
+    start: float
+    end: float
+    status: str = "UNSET"
+    children: list["Span"] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def read_spans(paths: Iterable[str]) -> dict[str, list[Span]]:
+    """Reads span files (one JSON object per line) and groups the spans by trace."""
+    traces: dict[str, list[Span]] = defaultdict(list)
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                traces[record["trace_id"]].append(Span(
+                    trace_id=record["trace_id"],
+                    span_id=record["span_id"],
+                    parent_id=record.get("parent_id"),
+                    name=record["name"],
+                    service=record.get("service") or "?",
+                    start=record["start"],
+                    end=record["end"],
+                    status=record.get("status", "UNSET"),
+                ))
+    return traces
+
+
+def _root(spans: list[Span]) -> Optional[Span]:
+    # Links the spans into a tree and returns the longest span without a
+    # parent in the trace; spans whose parent was never written are roots too.
+    by_id = {span.span_id: span for span in spans}
+    roots = []
+    for span in spans:
+        span.children = []
+    for span in spans:
+        parent = by_id.get(span.parent_id) if span.parent_id else None
+        if parent is None:
+            roots.append(span)
+        else:
+            parent.children.append(span)
+    return max(roots, key=lambda span: span.duration, default=None)
+
+
+def critical_path(span: Span, until: Optional[float] = None, depth: int = 0) -> list[tuple[int, Span, float]]:
+    """
+    The spans on the critical path below `span`, each with its depth and the
+    time it spent on the path itself, which add up to the span's duration.
+
+    Walking back from the end of `span`, the child that finished last is on
+    the path; then the child that finished last before that one started,
+    and so on. The time in between is the span's own.
+    """
+    until = span.end if until is None else until
+    cursor = until
+    on_path = []
+    children = list(span.children)
+    while candidates := [child for child in children if max(child.start, span.start) < cursor]:
+        latest = max(min(child.end, cursor) for child in candidates)
+        # Of the spans that finish together, the one that started first did
+        # the work the others waited for (e.g. tool calls run in parallel).
+        child = min(
+            (child for child in candidates if min(child.end, cursor) >= latest - SAME_END),
+            key=lambda child: child.start,
+        )
+        on_path.append((child, min(child.end, cursor)))
+        cursor = max(child.start, span.start)
+        children.remove(child)
+    on_path.reverse()
+    busy = sum(end - max(child.start, span.start) for child, end in on_path)
+    entries = [(depth, span, (until - span.start) - busy)]
+    for child, end in on_path:
+        entries.extend(critical_path(child, end, depth + 1))
+    return entries
+
+
+def critical_path_report(paths: Iterable[str], limit: int = 10, trace_id: Optional[str] = None) -> str:
+    """
+    Describes the critical path of the slowest `limit` requests in the span
+    files at `paths`, or of the one with `trace_id`, and how its time is
+    split between the services.
+    """
+    traces = read_spans(paths)
+    if trace_id is not None:
+        traces = {trace_id: traces.get(trace_id, [])}
+    roots = [root for root in (_root(spans) for spans in traces.values()) if root is not None]
+    roots.sort(key=lambda root: root.duration, reverse=True)
+
+    lines = []
+    for root in roots[:limit]:
+        path = critical_path(root)
+        lines.append(f"trace {root.trace_id}  {root.name} ({root.service})  {root.duration:.3f}s")
+        lines.append(f"  {'own':>8}{'total':>9}  span")
+        by_service: dict[str, float] = defaultdict(float)
+        for depth, span, own in path:
+            by_service[span.service] += own
+            status = "  [error]" if span.status == "ERROR" else ""
+            lines.append(
+                f"  {own:>7.3f}s{span.duration:>8.3f}s  {'  ' * depth}{span.name} ({span.service}){status}"
+            )
+        lines.append("  by service: " + ", ".join(
+            f"{service} {seconds:.3f}s ({seconds / root.duration if root.duration else 0:.0%})"
+            for service, seconds in sorted(by_service.items(), key=lambda item: -item[1])
+        ))
+        lines.append("")
+    if not lines:
+        return "No traces found."
+    return "\n".join(lines).rstrip()
@@ -0,0 +1,82 @@
+"""Admission control for the tasks an agent executes."""
+
+import asyncio
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from a2a.types import InternalError
+from a2a.utils.errors import ServerError
+
+from metrics import ADMISSIONS, ADMISSION_QUEUE_SECONDS, TASKS_QUEUED, TASKS_RUNNING
+
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", 8))
+AGENT_MAX_QUEUE = int(os.getenv("AGENT_MAX_QUEUE", 32))
+AGENT_QUEUE_TIMEOUT = float(os.getenv("AGENT_QUEUE_TIMEOUT", 30))
+
+
+class AdmissionController:
+    """
+    Limits how many tasks an agent executes at once.
+
+    Up to `max_concurrency` tasks run together and up to `max_queue` more
+    wait for a slot in arrival order. A task that finds the queue full, or
+    waits longer than `queue_timeout` seconds, is rejected with a retryable
+    error before any work is done for it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = AGENT_MAX_CONCURRENCY,
+        max_queue: int = AGENT_MAX_QUEUE,
+        queue_timeout: float = AGENT_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # Tasks running or waiting, counted on arrival rather than from the
+        # semaphore, which only changes once a waiter is scheduled.
+        self._admitted = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Holds an execution slot for the duration of the block."""
+        if self._admitted >= self.max_concurrency + self.max_queue:
+            ADMISSIONS.labels(outcome="queue_full").inc()
+            raise _busy("the agent's queue is full")
+
+        self._admitted += 1
+        try:
+            await self._wait_for_slot()
+            ADMISSIONS.labels(outcome="admitted").inc()
+            TASKS_RUNNING.inc()
+            try:
+                yield
+            finally:
+                TASKS_RUNNING.dec()
+                self._slots.release()
+        finally:
+            self._admitted -= 1
+
+    async def _wait_for_slot(self) -> None:
+        TASKS_QUEUED.inc()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            ADMISSIONS.labels(outcome="timeout").inc()
+            raise _busy("no execution slot became free in time") from None
+        finally:
+            TASKS_QUEUED.dec()
+            ADMISSION_QUEUE_SECONDS.observe(time.perf_counter() - start)
+
+
+def _busy(reason: str) -> ServerError:
+    return ServerError(
+        error=InternalError(
+            message=f"Agent is busy: {reason}. Retry later.",
+            data={"retryable": True, "retryAfter": 1},
+        )
+    )
@@ -2,14 +2,26 @@ import os
 from dotenv import load_dotenv
 
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.tools.mcp_tool import MCPToolset, StreamableHTTPConnectionParams
+from google.adk.tools.mcp_tool import StreamableHTTPConnectionParams
+from pydantic import BaseModel, Field
+
+import metrics
+from blob_store import inline_artifacts
+from history import compact_history
+from model_tiers import TierPolicy, tiered_llm
+from parallel_tools import ParallelToolCalls
+from prerouter import ASIN, PreRouter, Route
+from structured_output import StructuredOutput
+from warm_toolset import WarmMCPToolset
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise ValueError("OPENAI_API_KEY is not loaded.")
 model_name = "gpt-4o-mini-2024-07-18"
+# Short requests name one product or query and need a single tool call;
+# formatting the results of one call is left to the small model too.
+tier_policy = TierPolicy(max_tool_calls=1, simple_request_chars=200)
 
 system_prompt = """
 You are Price_Scraper_Agent, an intelligent assistant specialized in retrieving accurate and up-to-date product price information from Amazon.
@@ -21,8 +33,13 @@ Your primary task is to:
 4. Return a structured response including product title, price, currency, and product ID.
 
 You must use the following tools:
-- `search_amazon_products(query: str) -> List[Dict]`: returns a list of product metadata including title and product ID.
-- `get_product_price(product_id: str) -> Dict`: returns the price and currency for a given product.
+- `search_amazon_products(query: str, geo_locations: List[str] = None, domains: List[str] = None) -> List[Dict]`: returns a list of product metadata including title and product ID.
+- `get_product_price(product_id: str, geo_locations: List[str] = None, domains: List[str] = None) -> Dict`: returns the price and currency for a given product.
+
+When the user asks to compare prices across regions or marketplaces, pass all of them at once
+through `geo_locations` (delivery postal codes, e.g. ["90210", "10001"]) and/or `domains`
+(Amazon marketplaces, e.g. ["com", "co.uk", "de"]) instead of calling a tool once per region.
+The tool then returns a single comparison table with one price column per region.
 
 Guidelines:
 - Always select the top result from the product search unless otherwise instructed.
@@ -42,19 +59,77 @@ Example response:
   ]
 }
 """
-    
+
+class PriceResult(BaseModel):
+    title: str | None = None
+    price: float | None = None
+    currency: str | None = None
+    product_id: str
+    region: str | None = Field(
+        default=None, description="Postal code or marketplace of a regional price."
+    )
+
+
+class PriceReport(BaseModel):
+    query: str
+    results: list[PriceResult]
+    message: str | None = Field(default=None, description="Why there are no results, if so.")
+
+
+# The answer goes to the host as data of this shape.
+structured_output = StructuredOutput(PriceReport)
+
+# A host running the agent in process sets the server URL itself.
+DEFAULT_MCP_SERVER_URL = "http://localhost:8081/mcp"
+
+toolset = WarmMCPToolset(
+    connection_params=StreamableHTTPConnectionParams(
+        url=os.getenv("MCP_SERVER_URL", DEFAULT_MCP_SERVER_URL)
+    )
+)
+
+def render_price(args, result):
+    if not result.get("price"):
+        return None
+    return {
+        "query": args["product_id"],
+        "results": [
+            {
+                "title": result.get("title"),
+                "price": result.get("price"),
+                "product_id": args["product_id"]
+            }
+        ]
+    }
+
+# Price lookups by ASIN alone are answered with a single tool call.
+prerouter = PreRouter(toolset, [
+    Route(
+        rf"(?:(?:what is|what's|get|find|check) )?(?:the )?(?:current )?price (?:of|for) (?:the )?(?:product )?{ASIN}",
+        "get_product_price",
+        render_price,
+    ),
+    Route(ASIN, "get_product_price", render_price),
+])
+
+parallel_tools = ParallelToolCalls([toolset])
+
 agent = Agent(
     name="price_scraper_agent",
     instruction=system_prompt,
     description="Searches Amazon for a product and retrieves its latest price.",
-    tools=[
-        MCPToolset(
-            connection_params=StreamableHTTPConnectionParams(
-                url=os.getenv("MCP_SERVER_URL", "http://localhost:8081/mcp")
-            )
-        )
+    tools=[toolset],
+    model=tiered_llm(model_name, tier_policy),
+    before_model_callback=[
+        compact_history,
+        inline_artifacts,
+        structured_output.before_model_callback,
+        metrics.before_model_callback,
     ],
-    model=LiteLlm(model=model_name)
+    after_model_callback=[metrics.after_model_callback, parallel_tools.after_model_callback],
+    # Calls run in parallel are timed where they run and skip the metrics callback.
+    before_tool_callback=[parallel_tools.before_tool_callback, metrics.before_tool_callback],
+    after_tool_callback=metrics.after_tool_callback,
 )
 
 root_agent = agent
\ No newline at end of file
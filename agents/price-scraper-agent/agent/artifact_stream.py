@@ -0,0 +1,98 @@
+"""Streaming of an agent's answer to A2A clients as artifact chunks."""
+
+import os
+import time
+import uuid
+
+from a2a.server.tasks import TaskUpdater
+from a2a.types import Artifact, Part, TaskArtifactUpdateEvent, TextPart
+from google.adk.agents.run_config import RunConfig, StreamingMode
+
+from metrics import ARTIFACT_CHUNKS, FIRST_CHUNK_SECONDS
+
+STREAM_ARTIFACTS = os.getenv("STREAM_ARTIFACTS", "true").lower() in ("1", "true")
+STREAM_CHUNK_INTERVAL = float(os.getenv("STREAM_CHUNK_INTERVAL", 0.1))
+
+
+def streaming_run_config() -> RunConfig:
+    """Run config that makes ADK yield partial LLM output when streaming is on."""
+    if not STREAM_ARTIFACTS:
+        return RunConfig()
+    return RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+class ArtifactStream:
+    """
+    The answer artifact of one task, sent while it is being generated.
+
+    Text passed to `write` goes out as chunks appended to the artifact. The
+    first chunk is sent at once and later ones at most every `interval`
+    seconds, so a fast token stream doesn't become one task store write per
+    token. `finish` sends the rest as the last chunk. Text the model streams
+    before it calls a tool is not part of the answer: `discard` drops it and
+    the next chunk replaces the artifact.
+    """
+
+    def __init__(self, task_updater: TaskUpdater, interval: float = STREAM_CHUNK_INTERVAL):
+        self.interval = interval
+        self._updater = task_updater
+        self._artifact_id = str(uuid.uuid4())
+        self._buffer: list[str] = []
+        self._chunks = 0
+        # Whether the artifact holds text that is to be replaced, and whether
+        # text of the answer has been written since.
+        self._discarded = False
+        self._written = False
+        self._started = time.monotonic()
+        self._last_sent = float("-inf")
+
+    @property
+    def started(self) -> bool:
+        """Whether any text has been written since the last `discard`."""
+        return self._written
+
+    async def write(self, text: str) -> None:
+        """Adds streamed text to the artifact."""
+        if not text:
+            return
+        self._buffer.append(text)
+        self._written = True
+        if time.monotonic() - self._last_sent >= self.interval:
+            await self._send(last_chunk=False)
+
+    def discard(self) -> None:
+        """Drops the text written so far, e.g. narration before a tool call."""
+        self._buffer = []
+        self._discarded = self._discarded or self._chunks > 0
+        self._written = False
+
+    async def finish(self, parts: list[Part]) -> None:
+        """
+        Completes the artifact with the final answer `parts`.
+
+        If the answer was streamed, its text has already been sent and only
+        the remaining text and any other parts make up the last chunk.
+        """
+        if self.started:
+            parts = [part for part in parts if not isinstance(getattr(part, "root", part), TextPart)]
+        await self._send(last_chunk=True, extra=parts)
+
+    async def _send(self, last_chunk: bool, extra: list[Part] = ()) -> None:
+        parts = [TextPart(text="".join(self._buffer))] if self._buffer else []
+        parts.extend(extra)
+        self._buffer = []
+        if self._chunks == 0:
+            FIRST_CHUNK_SECONDS.observe(time.monotonic() - self._started)
+        await self._updater.event_queue.enqueue_event(
+            TaskArtifactUpdateEvent(
+                taskId=self._updater.task_id,
+                contextId=self._updater.context_id,
+                artifact=Artifact(artifactId=self._artifact_id, parts=parts),
+                append=self._chunks > 0 and not self._discarded,
+                lastChunk=last_chunk,
+            )
+        )
+        self._chunks += 1
+        self._discarded = False
+        self._last_sent = time.monotonic()
+        ARTIFACT_CHUNKS.inc()
@@ -0,0 +1,216 @@
+"""Large binary parts kept in the artifact service and passed around by reference."""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from typing import Optional
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.artifacts import BaseArtifactService
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from history import current_turn_start
+from metrics import BLOBS_OFFLOADED
+
+BLOB_INLINE_LIMIT = int(os.getenv("BLOB_INLINE_LIMIT", 64 * 1024))
+BLOB_READ_CHUNK = int(os.getenv("BLOB_READ_CHUNK", 64 * 1024))
+BLOB_TTL = float(os.getenv("BLOB_TTL", 3600))
+BLOB_MAX_BYTES = int(os.getenv("BLOB_MAX_BYTES", 256 * 1024 * 1024))
+
+ARTIFACT_SCHEME = "artifact"
+ARTIFACT_ROUTE = "/artifacts/{session_id}/{filename}"
+
+# Besides images, which the model takes as they are, files of these types
+# are shown to it as text.
+_TEXT_MIME_TYPES = ("text/", "application/json", "application/xml", "application/csv")
+
+
+class BlobStore:
+    """
+    Moves binary parts larger than `inline_limit` bytes into an artifact service.
+
+    An offloaded part becomes a `file_data` part whose URI,
+    `artifact://<session>/<filename>?version=<n>`, names the artifact, so
+    session events, task store entries and SSE frames carry the reference
+    instead of the base64 payload. A2A clients get the same artifact as an
+    HTTP URL under `base_url`, served by `endpoint` in chunks.
+
+    Offloaded blobs are deleted `ttl` seconds after they were last stored,
+    and oldest first once they hold more than `max_bytes`; the session
+    service also deletes them with their session.
+    """
+
+    def __init__(
+        self,
+        artifact_service: BaseArtifactService,
+        app_name: str,
+        base_url: str,
+        user_id: str = "self",
+        inline_limit: int = BLOB_INLINE_LIMIT,
+        ttl: float = BLOB_TTL,
+        max_bytes: int = BLOB_MAX_BYTES,
+    ):
+        self.artifact_service = artifact_service
+        self.app_name = app_name
+        self.base_url = base_url
+        self.user_id = user_id
+        self.inline_limit = inline_limit
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # Offloaded blobs by session and filename, from least to most
+        # recently stored, with the time they were stored and their size.
+        self._stored: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self.total_bytes = 0
+
+    async def offload(self, session_id: str, part: types.Part) -> types.Part:
+        """Returns `part`, or a reference to it if it is a blob over the limit."""
+        blob = part.inline_data
+        if blob is None or blob.data is None or len(blob.data) <= self.inline_limit:
+            return part
+        filename = blob.display_name or "blob-" + hashlib.sha256(blob.data).hexdigest()[:16]
+        version = await self.artifact_service.save_artifact(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=session_id,
+            filename=filename,
+            artifact=part,
+        )
+        BLOBS_OFFLOADED.inc()
+        self._remember((session_id, filename), len(blob.data))
+        await self._expire()
+        return types.Part(
+            file_data=types.FileData(
+                file_uri=artifact_uri(session_id, filename, version),
+                mime_type=blob.mime_type,
+                display_name=blob.display_name,
+            )
+        )
+
+    def _remember(self, key: tuple[str, str], size: int) -> None:
+        # Every version of a file counts until the file is deleted.
+        stored = self._stored.setdefault(key, [0.0, 0])
+        stored[0] = time.monotonic()
+        stored[1] += size
+        self.total_bytes += size
+        self._stored.move_to_end(key)
+
+    async def _expire(self) -> None:
+        # The newest blob is the one just offloaded, so it is always kept.
+        expired_before = time.monotonic() - self.ttl
+        while len(self._stored) > 1:
+            key, (stored_at, size) = next(iter(self._stored.items()))
+            if stored_at > expired_before and self.total_bytes <= self.max_bytes:
+                break
+            del self._stored[key]
+            self.total_bytes -= size
+            session_id, filename = key
+            # A no-op if the session service deleted it with its session.
+            await self.artifact_service.delete_artifact(
+                app_name=self.app_name,
+                user_id=self.user_id,
+                session_id=session_id,
+                filename=filename,
+            )
+
+    def public_part(self, part: types.Part) -> types.Part:
+        """Returns `part` with an artifact reference turned into an HTTP URL."""
+        reference = _parse_artifact_uri(part.file_data.file_uri) if part.file_data else None
+        if reference is None:
+            return part
+        session_id, filename, version = reference
+        url = f"{self.base_url.rstrip('/')}/artifacts/{quote(session_id)}/{quote(filename)}"
+        if version is not None:
+            url += f"?version={version}"
+        return types.Part(file_data=part.file_data.model_copy(update={"file_uri": url}))
+
+    async def endpoint(self, request: Request) -> Response:
+        """Serves an artifact's bytes."""
+        version = request.query_params.get("version")
+        part = await self.artifact_service.load_artifact(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=request.path_params["session_id"],
+            filename=request.path_params["filename"],
+            version=int(version) if version and version.isdigit() else None,
+        )
+        if part is None or part.inline_data is None:
+            return Response("Artifact not found", status_code=404)
+        return StreamingResponse(
+            _chunks(part.inline_data.data or b""),
+            media_type=part.inline_data.mime_type or "application/octet-stream",
+        )
+
+
+def add_artifact_route(app: Starlette, blobs: BlobStore) -> None:
+    """Exposes the offloaded blobs of `blobs` on an A2A application."""
+    app.add_route(ARTIFACT_ROUTE, blobs.endpoint, methods=["GET"])
+
+
+def artifact_uri(session_id: str, filename: str, version: int) -> str:
+    """The URI an offloaded part is referred to by."""
+    return f"{ARTIFACT_SCHEME}://{quote(session_id)}/{quote(filename)}?version={version}"
+
+
+def _parse_artifact_uri(uri: Optional[str]) -> Optional[tuple[str, str, Optional[int]]]:
+    if not uri:
+        return None
+    parts = urlsplit(uri)
+    if parts.scheme != ARTIFACT_SCHEME:
+        return None
+    version = parse_qs(parts.query).get("version", [None])[0]
+    return (
+        unquote(parts.netloc),
+        unquote(parts.path.lstrip("/")),
+        int(version) if version and version.isdigit() else None,
+    )
+
+
+async def _chunks(data: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), BLOB_READ_CHUNK):
+        yield data[start:start + BLOB_READ_CHUNK]
+
+
+async def inline_artifacts(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """
+    Puts the content of referenced blobs back into the prompt of the current turn.
+
+    Images are inlined as they are and text-like files as text; anything
+    else, and blobs from earlier turns, are shown to the model as a note
+    naming the file. Only the outgoing request changes, so the session
+    keeps the references.
+    """
+    turn_start = current_turn_start(llm_request.contents)
+    for index, content in enumerate(llm_request.contents):
+        for position, part in enumerate(content.parts or []):
+            reference = _parse_artifact_uri(part.file_data.file_uri) if part.file_data else None
+            if reference is None:
+                continue
+            _, filename, version = reference
+            inlined = None
+            if index >= turn_start:
+                artifact = await callback_context.load_artifact(filename, version)
+                inlined = _for_model(artifact, filename)
+            content.parts[position] = inlined or types.Part(
+                text=f"[File {filename} ({part.file_data.mime_type}) was attached.]"
+            )
+
+
+def _for_model(artifact: Optional[types.Part], filename: str) -> Optional[types.Part]:
+    blob = artifact.inline_data if artifact else None
+    if blob is None or not blob.mime_type:
+        return None
+    if blob.mime_type.startswith("image/"):
+        return artifact
+    if blob.mime_type.startswith(_TEXT_MIME_TYPES):
+        text = (blob.data or b"").decode("utf-8", errors="replace")
+        return types.Part(text=f"Contents of the attached file {filename}:\n{text}")
+    return None
@@ -0,0 +1,184 @@
+"""Exact-match completion cache for deterministic LiteLlm calls."""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from metrics import LLM_CACHE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE = os.getenv("LLM_CACHE", "").lower() in ("1", "true")
+# Sampling temperature of every agent's model; the provider's default when
+# unset. Only calls at temperature 0 are cached, so LLM_CACHE needs it at 0.
+LLM_TEMPERATURE = os.getenv("LLM_TEMPERATURE")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm-cache.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))
+# Expired completions are deleted from the file at most this often.
+LLM_CACHE_PURGE_INTERVAL = float(os.getenv("LLM_CACHE_PURGE_INTERVAL", 300))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_expires_at ON completions (expires_at);
+"""
+
+
+class CompletionCache:
+    """
+    Completions kept in an in-memory LRU in front of a SQLite file.
+
+    The memory tier holds the most recent `max_entries` completions; the file
+    keeps everything younger than `ttl` seconds across restarts and is shared
+    by all processes that point at it.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        purge_interval: float = LLM_CACHE_PURGE_INTERVAL,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, expires_at: float, response: str) -> None:
+        self._memory[key] = (expires_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> tuple[float, str] | None:
+        return self._connection().execute(
+            "SELECT expires_at, response FROM completions WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+
+    def _store(self, key: str, expires_at: float, response: str) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO completions VALUES (?, ?, ?)", (key, response, expires_at)
+        )
+        now = time.time()
+        if now - self._purged_at >= self.purge_interval:
+            self._purged_at = now
+            conn.execute("DELETE FROM completions WHERE expires_at <= ?", (now,))
+
+    async def get(self, key: str) -> LlmResponse | None:
+        """Returns the cached completion for `key`, or None if missing or expired."""
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] > time.time():
+            self._memory.move_to_end(key)
+            LLM_CACHE_EVENTS.labels(event="memory_hit").inc()
+            return LlmResponse.model_validate_json(entry[1])
+        entry = await asyncio.to_thread(self._load, key)
+        if entry is None:
+            LLM_CACHE_EVENTS.labels(event="miss").inc()
+            return None
+        self._remember(key, *entry)
+        LLM_CACHE_EVENTS.labels(event="disk_hit").inc()
+        return LlmResponse.model_validate_json(entry[1])
+
+    async def put(self, key: str, response: LlmResponse) -> None:
+        """Stores a completion for `ttl` seconds."""
+        expires_at = time.time() + self.ttl
+        body = response.model_dump_json(exclude_none=True)
+        self._remember(key, expires_at, body)
+        await asyncio.to_thread(self._store, key, expires_at, body)
+
+
+class CachedLiteLlm(LiteLlm):
+    """
+    A `LiteLlm` that serves repeated requests from a `CompletionCache`.
+
+    Only calls already made at temperature 0, through the agent's
+    `generate_content_config` or the model's arguments, are cached, keyed
+    by a hash of the model, the conversation, the system instruction and the
+    tool schema. Streamed calls are stored once complete and answered from
+    the cache in one piece.
+    """
+
+    _cache: CompletionCache = None
+
+    def __init__(self, model: str, cache: CompletionCache | None = None, **kwargs):
+        super().__init__(model=model, **kwargs)
+        self._cache = cache or CompletionCache()
+
+    def _is_deterministic(self, llm_request: LlmRequest) -> bool:
+        temperature = llm_request.config.temperature if llm_request.config else None
+        return self._additional_args.get("temperature", temperature) == 0
+
+    def _cache_key(self, llm_request: LlmRequest) -> str:
+        request = llm_request.model_copy(update={"model": self.model}).model_dump_json(
+            include={"model", "contents", "config"}, exclude_none=True
+        )
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if not self._is_deterministic(llm_request):
+            async for response in super().generate_content_async(llm_request, stream):
+                yield response
+            return
+
+        key = self._cache_key(llm_request)
+        cached = await self._cache.get(key)
+        if cached is not None:
+            cached.custom_metadata = {**(cached.custom_metadata or {}), "cache_hit": True}
+            yield cached
+            return
+        async for response in super().generate_content_async(llm_request, stream):
+            if response.content and not response.partial and not response.error_code:
+                await self._cache.put(key, response)
+            yield response
+
+
+def lite_llm(model: str) -> LiteLlm:
+    """
+    Returns the model for an agent, sampling at LLM_TEMPERATURE if set.
+
+    With LLM_CACHE set, repeated requests made at temperature 0 are answered
+    from the completion cache. No agent sets a temperature of its own, so
+    the cache only serves calls when LLM_TEMPERATURE is 0.
+    """
+    kwargs = {}
+    if LLM_TEMPERATURE:
+        kwargs["temperature"] = float(LLM_TEMPERATURE)
+    if not LLM_CACHE:
+        return LiteLlm(model=model, **kwargs)
+    if kwargs.get("temperature") != 0:
+        logger.warning(
+            "LLM_CACHE is on but LLM_TEMPERATURE is not 0; calls to %s are not cached", model
+        )
+    return CachedLiteLlm(model=model, **kwargs)
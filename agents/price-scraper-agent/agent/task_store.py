@@ -0,0 +1,174 @@
+"""SQLite-backed task store for the A2A request handlers."""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from a2a.server.tasks import TaskStore
+from a2a.types import Artifact, Task, TaskState
+
+logger = logging.getLogger(__name__)
+
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", "tasks.sqlite3")
+TASK_TTL = float(os.getenv("TASK_TTL", 24 * 3600))
+TASK_COMPACT_INTERVAL = float(os.getenv("TASK_COMPACT_INTERVAL", 300))
+
+TERMINAL_STATES = (
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    body TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_state_updated_at ON tasks (state, updated_at);
+CREATE TABLE IF NOT EXISTS artifacts (
+    task_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (task_id, position)
+);
+"""
+
+
+class SqliteTaskStore(TaskStore):
+    """
+    A `TaskStore` that keeps tasks in a SQLite database.
+
+    Artifacts are stored in their own table and only loaded when a task is
+    read, so saving status updates doesn't rewrite them. Tasks in a terminal
+    state are deleted once they haven't changed for `ttl` seconds. Queries
+    run in a worker thread with one connection per thread, and the database
+    uses WAL mode so reads don't wait for writes.
+    """
+
+    def __init__(
+        self,
+        path: str = TASK_STORE_PATH,
+        ttl: float = TASK_TTL,
+        compact_interval: float = TASK_COMPACT_INTERVAL,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.compact_interval = compact_interval
+        self._local = threading.local()
+        self._next_compaction = 0.0
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _save(self, task: Task) -> None:
+        now = time.time()
+        artifacts = [artifact.model_dump_json(exclude_none=True) for artifact in task.artifacts or []]
+        body = task.model_copy(update={"artifacts": None}).model_dump_json(exclude_none=True)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?)",
+                (task.id, task.status.state.value, body, now),
+            )
+            # Unchanged artifacts are left as they are.
+            conn.executemany(
+                "INSERT INTO artifacts VALUES (?, ?, ?) ON CONFLICT (task_id, position) "
+                "DO UPDATE SET body = excluded.body WHERE body != excluded.body",
+                [(task.id, position, artifact) for position, artifact in enumerate(artifacts)],
+            )
+            conn.execute(
+                "DELETE FROM artifacts WHERE task_id = ? AND position >= ?",
+                (task.id, len(artifacts)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if now >= self._next_compaction:
+            self._next_compaction = now + self.compact_interval
+            self.compact()
+
+    def _get(self, task_id: str) -> Task | None:
+        conn = self._connection()
+        row = conn.execute("SELECT body FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        task = Task.model_validate_json(row[0])
+        artifacts = conn.execute(
+            "SELECT body FROM artifacts WHERE task_id = ? ORDER BY position", (task_id,)
+        ).fetchall()
+        if artifacts:
+            task.artifacts = [Artifact.model_validate_json(body) for (body,) in artifacts]
+        return task
+
+    def _delete(self, task_id: str) -> None:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount
+            conn.execute("DELETE FROM artifacts WHERE task_id = ?", (task_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if not deleted:
+            logger.warning("Attempted to delete nonexistent task with id: %s", task_id)
+
+    async def save(self, task: Task) -> None:
+        """Saves or updates a task."""
+        await asyncio.to_thread(self._save, task)
+
+    async def get(self, task_id: str) -> Task | None:
+        """Retrieves a task by ID, with its artifacts."""
+        return await asyncio.to_thread(self._get, task_id)
+
+    async def delete(self, task_id: str) -> None:
+        """Deletes a task and its artifacts."""
+        await asyncio.to_thread(self._delete, task_id)
+
+    def compact(self) -> int:
+        """
+        Deletes terminal tasks that haven't changed for `ttl` seconds.
+
+        Returns:
+            int: The number of tasks deleted.
+        """
+        states = [state.value for state in TERMINAL_STATES]
+        expired = (
+            f"SELECT id FROM tasks WHERE state IN ({', '.join('?' * len(states))}) "
+            "AND updated_at < ?"
+        )
+        params = (*states, time.time() - self.ttl)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DELETE FROM artifacts WHERE task_id IN ({expired})", params)
+            deleted = conn.execute(f"DELETE FROM tasks WHERE id IN ({expired})", params).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if deleted:
+            logger.info("Compacted %d finished tasks from %s", deleted, self.path)
+        return deleted
+
+    def _count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    async def count(self) -> int:
+        """Returns the number of stored tasks."""
+        return await asyncio.to_thread(self._count)
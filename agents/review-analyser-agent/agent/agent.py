@@ -1,15 +1,27 @@
 import os
+from typing import Literal
 from dotenv import load_dotenv
 
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.tools.mcp_tool import MCPToolset, StreamableHTTPConnectionParams
+from google.adk.tools.mcp_tool import StreamableHTTPConnectionParams
+from pydantic import BaseModel, Field
+
+import metrics
+from blob_store import inline_artifacts
+from history import compact_history
+from model_tiers import TierPolicy, tiered_llm
+from parallel_tools import ParallelToolCalls
+from structured_output import StructuredOutput
+from warm_toolset import WarmMCPToolset
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise ValueError("OPENAI_API_KEY is not loaded.")
 model_name = "gpt-4o-mini-2024-07-18"
+# Picking the tool for a short request is simple, but analysing the reviews
+# it returns is not, so tool results always go to the large model.
+tier_policy = TierPolicy(max_tool_calls=0, simple_request_chars=200)
 
 system_prompt = """
 You are ReviewAnalyzerAgent, an intelligent assistant specialized in retrieving and analyzing product reviews from Amazon.
@@ -31,18 +43,49 @@ Guidelines:
 - Do not guess or fabricate data. Only rely on tool outputs.
 """
 
+class ReviewAnalysis(BaseModel):
+    product_id: str
+    review_count: int
+    sentiment: Literal["positive", "negative", "mixed"] | None = None
+    sentiment_score: float | None = Field(
+        default=None, description="From -1 (all negative) to 1 (all positive)."
+    )
+    pros: list[str]
+    cons: list[str]
+    highlights: list[str]
+    message: str | None = Field(default=None, description="Why there is no analysis, if so.")
+
+
+# The answer goes to the host as data of this shape.
+structured_output = StructuredOutput(ReviewAnalysis)
+
+# A host running the agent in process sets the server URL itself.
+DEFAULT_MCP_SERVER_URL = "http://localhost:8082/mcp"
+
+toolset = WarmMCPToolset(
+    connection_params=StreamableHTTPConnectionParams(
+        url=os.getenv("MCP_SERVER_URL", DEFAULT_MCP_SERVER_URL)
+    )
+)
+
+parallel_tools = ParallelToolCalls([toolset])
+
 agent = Agent(
     name="review_analyser_agent",
     instruction=system_prompt,
     description="Retrieves customer reviews for products from the Amazon.",
-    tools=[
-        MCPToolset(
-            connection_params=StreamableHTTPConnectionParams(
-                url=os.getenv("MCP_SERVER_URL", "http://localhost:8082/mcp")
-            )
-        )
+    tools=[toolset],
+    model=tiered_llm(model_name, tier_policy),
+    before_model_callback=[
+        compact_history,
+        inline_artifacts,
+        structured_output.before_model_callback,
+        metrics.before_model_callback,
     ],
-    model=LiteLlm(model=model_name)
+    after_model_callback=[metrics.after_model_callback, parallel_tools.after_model_callback],
+    # Calls run in parallel are timed where they run and skip the metrics callback.
+    before_tool_callback=[parallel_tools.before_tool_callback, metrics.before_tool_callback],
+    after_tool_callback=metrics.after_tool_callback,
 )
 
 root_agent = agent
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""Model tiers: a small model for simple LLM calls, a large one for the rest."""
+
+import logging
+import os
+import time
+from collections.abc import AsyncGenerator, Callable
+from dataclasses import dataclass
+
+import litellm
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from opentelemetry import trace
+
+from history import current_turn_start
+from llm_cache import lite_llm
+from metrics import LLM_TIER_CALLS, LLM_TIER_COST, LLM_TIER_LATENCY, LLM_TIER_TOKENS
+
+logger = logging.getLogger(__name__)
+
+SMALL_MODEL_NAME = os.getenv("SMALL_MODEL_NAME", "gpt-4.1-nano-2025-04-14")
+# Off by default: the small model answers differently and needs a deployment
+# of its own. With it on, the llm_tier_* metrics show how calls are split.
+MODEL_TIERS = os.getenv("MODEL_TIERS", "").lower() in ("1", "true")
+
+SMALL = "small"
+LARGE = "large"
+
+
+@dataclass
+class TierPolicy:
+    """
+    Decides which tier answers an LLM call.
+
+    A call that only has to turn tool results into the answer goes to the
+    small tier as long as the current turn made at most `max_tool_calls`
+    tool calls; after more than that the model is doing multi-step work and
+    the large tier takes over. The first call of a turn goes to the small
+    tier when the user's message is at most `simple_request_chars` long
+    (0 sends every first call to the large tier).
+    """
+
+    max_tool_calls: int = 1
+    simple_request_chars: int = 0
+
+    def __call__(self, llm_request: LlmRequest) -> str:
+        contents = llm_request.contents
+        turn = contents[current_turn_start(contents):]
+        tool_calls = sum(
+            1 for content in turn for part in content.parts or [] if part.function_call
+        )
+        if tool_calls == 0:
+            request = "".join(
+                part.text or "" for content in turn[:1] for part in content.parts or []
+            )
+            return SMALL if len(request) <= self.simple_request_chars else LARGE
+        last = turn[-1]
+        if any(part.function_response for part in last.parts or []):
+            return SMALL if tool_calls <= self.max_tool_calls else LARGE
+        return LARGE
+
+
+class TieredLlm(BaseLlm):
+    """
+    A model that hands each call to the tier `policy` picks.
+
+    The latency, token usage and cost of every call are logged and recorded
+    per tier, so the split can be tuned from the metrics.
+    """
+
+    _tiers: dict[str, BaseLlm] = None
+    _policy: Callable[[LlmRequest], str] = None
+
+    def __init__(self, small: BaseLlm, large: BaseLlm, policy: Callable[[LlmRequest], str]):
+        super().__init__(model=f"{small.model}|{large.model}")
+        self._tiers = {SMALL: small, LARGE: large}
+        self._policy = policy
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        tier = self._policy(llm_request)
+        llm = self._tiers[tier]
+        trace.get_current_span().set_attributes({"llm.tier": tier, "llm.model": llm.model})
+        start = time.perf_counter()
+        usage = None
+        cached = False
+        async for response in llm.generate_content_async(llm_request, stream):
+            usage = response.usage_metadata or usage
+            cached = cached or bool((response.custom_metadata or {}).get("cache_hit"))
+            yield response
+        _record(tier, llm.model, time.perf_counter() - start, usage, cached)
+
+
+def _record(tier: str, model: str, seconds: float, usage, cached: bool) -> None:
+    prompt_tokens = (usage and usage.prompt_token_count) or 0
+    completion_tokens = (usage and usage.candidates_token_count) or 0
+    cost = 0.0
+    if not cached:
+        try:
+            cost = sum(litellm.cost_per_token(
+                model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+            ))
+        except Exception:
+            logger.debug("No price known for %s", model)
+    LLM_TIER_CALLS.labels(tier=tier, model=model).inc()
+    LLM_TIER_LATENCY.labels(tier=tier).observe(seconds)
+    if not cached:
+        LLM_TIER_TOKENS.labels(tier=tier, kind="prompt").inc(prompt_tokens)
+        LLM_TIER_TOKENS.labels(tier=tier, kind="completion").inc(completion_tokens)
+        LLM_TIER_COST.labels(tier=tier, model=model).inc(cost)
+    logger.info(
+        "LLM call tier=%s model=%s latency=%.2fs tokens=%d+%d cost=$%.6f%s",
+        tier, model, seconds, prompt_tokens, completion_tokens, cost,
+        " (cached)" if cached else "",
+    )
+
+
+def tiered_llm(
+    model: str,
+    policy: Callable[[LlmRequest], str],
+    small_model: str = SMALL_MODEL_NAME,
+) -> BaseLlm:
+    """
+    Returns an agent's model: `small_model` and `model` behind `policy`, or
+    just `model` when MODEL_TIERS is off.
+    """
+    if not MODEL_TIERS:
+        return lite_llm(model)
+    return TieredLlm(lite_llm(small_model), lite_llm(model), policy)
@@ -0,0 +1,138 @@
+"""
+Distributed tracing across the host, the child agents and the MCP servers.
+
+Spans are recorded only when TRACE_FILE (one JSON object per line) or
+OTEL_EXPORTER_OTLP_ENDPOINT is set; ADK's own spans for agent runs, LLM
+calls and tool calls are recorded with ours. The W3C trace context goes
+from agent to agent in the A2A message metadata and to the MCP servers in
+the `_meta` of each tool call, so one request is one trace.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Mapping, Sequence
+from typing import Any, Optional
+
+from opentelemetry import context as context_api
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanLimits, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+# ADK puts whole LLM requests and responses into span attributes.
+TRACE_ATTRIBUTE_LIMIT = int(os.getenv("TRACE_ATTRIBUTE_LIMIT", 1024))
+# The A2A SDK has a span for every request handler and event queue call.
+TRACE_A2A_SDK = os.getenv("TRACE_A2A_SDK", "").lower() in ("1", "true")
+_A2A_SDK_SCOPE = "a2a-python-sdk"
+
+tracer = trace.get_tracer("agents")
+
+
+class _SpanProcessor(BatchSpanProcessor):
+    # Leaves out the A2A SDK's spans unless TRACE_A2A_SDK is set.
+    def on_end(self, span: ReadableSpan) -> None:
+        scope = span.instrumentation_scope
+        if not TRACE_A2A_SDK and scope is not None and scope.name == _A2A_SDK_SCOPE:
+            return
+        super().on_end(span)
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(span_record(span), default=str) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as file:
+                file.write(lines)
+        except OSError as e:
+            logger.warning("Could not write spans to %s: %s", self.path, e)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def span_record(span: ReadableSpan) -> dict[str, Any]:
+    """The JSON form of a finished span, with times in seconds since the epoch."""
+    return {
+        "trace_id": format(span.context.trace_id, "032x"),
+        "span_id": format(span.context.span_id, "016x"),
+        "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "name": span.name,
+        "kind": span.kind.name,
+        "service": span.resource.attributes.get("service.name"),
+        "start": span.start_time / 1e9,
+        "end": span.end_time / 1e9,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+    }
+
+
+def setup_tracing(service_name: str) -> None:
+    """
+    Installs the span exporters; does nothing if none is configured or
+    they are installed already (the children of an in-process host).
+    """
+    if not TRACE_FILE and not OTLP_ENDPOINT:
+        return
+    if isinstance(trace.get_tracer_provider(), TracerProvider):
+        return
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        span_limits=SpanLimits(max_span_attribute_length=TRACE_ATTRIBUTE_LIMIT),
+    )
+    if TRACE_FILE:
+        provider.add_span_processor(_SpanProcessor(JsonLinesSpanExporter(TRACE_FILE)))
+    if OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning(
+                "OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp is not installed"
+            )
+        else:
+            provider.add_span_processor(_SpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+def inject_context(carrier: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """Adds the current trace context to `carrier` and returns it."""
+    carrier = {} if carrier is None else carrier
+    propagate.inject(carrier)
+    return carrier
+
+
+def extract_context(carrier: Optional[Mapping[str, Any]]) -> Context:
+    """
+    The trace context a caller put into `carrier`, e.g. A2A message
+    metadata, or the current context if it sent none.
+    """
+    return propagate.extract(carrier or {}, context=context_api.get_current())
+
+
+def parent_context() -> Optional[Context]:
+    """
+    A context whose current span is the parent of the current span, for
+    work that is started from one span but belongs next to it.
+    """
+    parent = getattr(trace.get_current_span(), "parent", None)
+    if parent is None:
+        return None
+    return trace.set_span_in_context(trace.NonRecordingSpan(parent))
@@ -0,0 +1,192 @@
+"""MCP toolset that connects ahead of requests and stays connected."""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import List, Optional
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.mcp_tool import MCPTool, MCPToolset
+from google.adk.tools.mcp_tool.mcp_session_manager import MCPSessionManager
+from google.adk.tools.tool_context import ToolContext
+from mcp import ClientSession
+from mcp import types as mcp_types
+from opentelemetry.trace import SpanKind
+
+from metrics import MCP_CONNECTION_EVENTS
+from tracing import inject_context, tracer
+
+logger = logging.getLogger(__name__)
+
+MCP_PING_INTERVAL = float(os.getenv("MCP_PING_INTERVAL", 30))
+MCP_PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", 10))
+MCP_TOOLS_TTL = float(os.getenv("MCP_TOOLS_TTL", 300))
+MCP_RECONNECT_MAX_DELAY = float(os.getenv("MCP_RECONNECT_MAX_DELAY", 30))
+
+
+class TracedMCPTool(MCPTool):
+    """An `MCPTool` that sends the trace context in the `_meta` of its calls."""
+
+    async def _run_async_impl(self, *, args, tool_context: ToolContext, credential):
+        headers = await self._get_headers(tool_context, credential)
+        session = await self._mcp_session_manager.create_session(headers=headers)
+        with tracer.start_as_current_span(
+            f"mcp.call_tool {self.name}", kind=SpanKind.CLIENT, attributes={"mcp.tool": self.name}
+        ):
+            return await session.send_request(
+                mcp_types.ClientRequest(
+                    mcp_types.CallToolRequest(
+                        method="tools/call",
+                        params=mcp_types.CallToolRequestParams(
+                            name=self.name, arguments=args, _meta=inject_context()
+                        ),
+                    )
+                ),
+                mcp_types.CallToolResult,
+            )
+
+
+class WarmMCPToolset(MCPToolset):
+    """
+    An `MCPToolset` whose session and tool list are ready before the first request.
+
+    `start()` launches a background task that opens the MCP session, fetches
+    the tool list and then pings the server every `ping_interval` seconds.
+    When a ping fails the session is dropped and reopened with exponential
+    backoff. The tool list is fetched again after every reconnect and every
+    `tools_ttl` seconds, and replaced only when its schemas changed.
+    `get_tools` answers from that list and only goes to the server while
+    there is none yet.
+    """
+
+    def __init__(
+        self,
+        *,
+        ping_interval: float = MCP_PING_INTERVAL,
+        ping_timeout: float = MCP_PING_TIMEOUT,
+        tools_ttl: float = MCP_TOOLS_TTL,
+        reconnect_max_delay: float = MCP_RECONNECT_MAX_DELAY,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.tools_ttl = tools_ttl
+        self.reconnect_max_delay = reconnect_max_delay
+        self._session: Optional[ClientSession] = None
+        self._tools: Optional[List[TracedMCPTool]] = None
+        self._tools_version: Optional[str] = None
+        self._tools_fetched_at = 0.0
+        self._holder: Optional[asyncio.Task] = None
+        self._keepalive: Optional[asyncio.Task] = None
+
+    def set_connection_params(self, connection_params) -> None:
+        """Points the toolset at another MCP server; only before `start`."""
+        if self._keepalive is not None or self._tools is not None:
+            raise RuntimeError("the toolset is already connected")
+        self._connection_params = connection_params
+        self._mcp_session_manager = MCPSessionManager(
+            connection_params=connection_params, errlog=self._errlog
+        )
+
+    async def start(self) -> None:
+        """Starts connecting in the background; safe to call more than once."""
+        if self._keepalive is None:
+            self._keepalive = asyncio.create_task(self._keep_alive())
+
+    async def get_tools(
+        self,
+        readonly_context: Optional[ReadonlyContext] = None,
+    ) -> List[BaseTool]:
+        if self._tools is None:
+            await self._fetch_tools(await self._mcp_session_manager.create_session())
+        return [
+            tool for tool in self._tools if self._is_tool_selected(tool, readonly_context)
+        ]
+
+    async def close(self) -> None:
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            await asyncio.gather(self._keepalive, return_exceptions=True)
+            self._keepalive = None
+        await self._disconnect()
+        await super().close()
+
+    async def _keep_alive(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                await self._check()
+                delay = 1.0
+                await asyncio.sleep(self.ping_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                MCP_CONNECTION_EVENTS.labels(event="failed").inc()
+                logger.warning("MCP server unreachable, retrying in %.0fs: %s", delay, e)
+                await self._disconnect()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+
+    async def _check(self) -> None:
+        if self._holder is None or self._holder.done():
+            await self._connect()
+        elif time.monotonic() - self._tools_fetched_at >= self.tools_ttl:
+            await self._fetch_tools(self._session)
+        else:
+            await asyncio.wait_for(self._session.send_ping(), self.ping_timeout)
+
+    async def _connect(self) -> None:
+        await self._disconnect()
+        ready = asyncio.get_running_loop().create_future()
+        self._holder = asyncio.create_task(self._hold_session(ready))
+        await asyncio.wait(
+            [ready, self._holder], timeout=self.ping_timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        if not ready.done():
+            raise ConnectionError("could not open an MCP session")
+        self._session = ready.result()
+        MCP_CONNECTION_EVENTS.labels(event="connected").inc()
+        await self._fetch_tools(self._session)
+
+    async def _hold_session(self, ready: asyncio.Future) -> None:
+        # The MCP transport runs in a task group that belongs to the task
+        # opening the session: it is cancelled when the connection breaks and
+        # must close the session itself, so each session gets its own task.
+        ready.set_result(await self._mcp_session_manager.create_session())
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self._mcp_session_manager.close()
+
+    async def _disconnect(self) -> None:
+        if self._holder is not None:
+            self._holder.cancel()
+            await asyncio.gather(self._holder, return_exceptions=True)
+        self._holder = None
+        self._session = None
+
+    async def _fetch_tools(self, session: ClientSession) -> None:
+        result = await asyncio.wait_for(session.list_tools(), self.ping_timeout)
+        version = hashlib.sha256(
+            "".join(tool.model_dump_json() for tool in result.tools).encode("utf-8")
+        ).hexdigest()
+        self._tools_fetched_at = time.monotonic()
+        if version == self._tools_version:
+            return
+        if self._tools_version is not None:
+            MCP_CONNECTION_EVENTS.labels(event="tools_changed").inc()
+            logger.info("MCP server tool list changed")
+        self._tools = [
+            TracedMCPTool(
+                mcp_tool=tool,
+                mcp_session_manager=self._mcp_session_manager,
+                auth_scheme=self._auth_scheme,
+                auth_credential=self._auth_credential,
+            )
+            for tool in result.tools
+        ]
+        self._tools_version = version
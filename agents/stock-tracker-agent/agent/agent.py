@@ -2,14 +2,26 @@ import os
 from dotenv import load_dotenv
 
 from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.tools.mcp_tool import MCPToolset, StreamableHTTPConnectionParams
+from google.adk.tools.mcp_tool import StreamableHTTPConnectionParams
+from pydantic import BaseModel, Field
+
+import metrics
+from blob_store import inline_artifacts
+from history import compact_history
+from model_tiers import TierPolicy, tiered_llm
+from parallel_tools import ParallelToolCalls
+from prerouter import ASIN, PreRouter, Route
+from structured_output import StructuredOutput
+from warm_toolset import WarmMCPToolset
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 if not openai_api_key:
     raise ValueError("OPENAI_API_KEY is not loaded.")
 model_name = "gpt-4o-mini-2024-07-18"
+# Short requests name one product or query and need a single tool call;
+# formatting the results of one call is left to the small model too.
+tier_policy = TierPolicy(max_tool_calls=1, simple_request_chars=200)
 
 system_prompt = """
 You are Stock_Tracker_Agent, an intelligent assistant specialized in tracking product availability from Amazon.
@@ -31,18 +43,73 @@ Guidelines:
 - Do not assume or fabricate stock information—only use the data returned by the tools.
 """
 
+class StockStatus(BaseModel):
+    title: str | None = None
+    stock: str | None = Field(default=None, description="Availability as reported by Amazon.")
+    product_id: str
+
+
+class StockReport(BaseModel):
+    query: str
+    results: list[StockStatus]
+    message: str | None = Field(default=None, description="Why there are no results, if so.")
+
+
+# The answer goes to the host as data of this shape.
+structured_output = StructuredOutput(StockReport)
+
+# A host running the agent in process sets the server URL itself.
+DEFAULT_MCP_SERVER_URL = "http://localhost:8082/mcp"
+
+toolset = WarmMCPToolset(
+    connection_params=StreamableHTTPConnectionParams(
+        url=os.getenv("MCP_SERVER_URL", DEFAULT_MCP_SERVER_URL)
+    )
+)
+
+def render_stock(args, result):
+    if not result or result.get("stock") is None:
+        return None
+    return {
+        "query": args["product_id"],
+        "results": [
+            {
+                "title": result.get("title"),
+                "stock": result.get("stock"),
+                "product_id": args["product_id"]
+            }
+        ]
+    }
+
+# Availability checks by ASIN alone are answered with a single tool call.
+prerouter = PreRouter(toolset, [
+    Route(
+        rf"(?:(?:what is|what's|get|find|check) )?(?:the )?(?:current )?(?:availability|stock|stock status|stock availability) (?:of|for) (?:the )?(?:product )?{ASIN}",
+        "get_product_stock",
+        render_stock,
+    ),
+    Route(rf"is (?:the )?(?:product )?{ASIN} (?:in stock|available)", "get_product_stock", render_stock),
+    Route(ASIN, "get_product_stock", render_stock),
+])
+
+parallel_tools = ParallelToolCalls([toolset])
+
 agent = Agent(
     name="stock_tracker_agent",
     instruction=system_prompt,
     description="Retrieves stock details of products in Amazon.",
-    tools=[
-        MCPToolset(
-            connection_params=StreamableHTTPConnectionParams(
-                url=os.getenv("MCP_SERVER_URL", "http://localhost:8082/mcp")
-            )
-        )
+    tools=[toolset],
+    model=tiered_llm(model_name, tier_policy),
+    before_model_callback=[
+        compact_history,
+        inline_artifacts,
+        structured_output.before_model_callback,
+        metrics.before_model_callback,
     ],
-    model=LiteLlm(model=model_name)
+    after_model_callback=[metrics.after_model_callback, parallel_tools.after_model_callback],
+    # Calls run in parallel are timed where they run and skip the metrics callback.
+    before_tool_callback=[parallel_tools.before_tool_callback, metrics.before_tool_callback],
+    after_tool_callback=metrics.after_tool_callback,
 )
 
 root_agent = agent
\ No newline at end of file
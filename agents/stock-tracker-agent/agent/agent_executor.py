@@ -1,25 +1,41 @@
+import asyncio
+import base64
 from collections.abc import AsyncGenerator
 import logging
 
 from google.adk import Runner
+from google.adk.agents.run_config import RunConfig
+from google.adk.agents.invocation_context import new_invocation_context_id
 from google.adk.events import Event
+from google.adk.sessions import Session
 from google.genai import types
+from opentelemetry.trace import SpanKind
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events.event_queue import EventQueue
 from a2a.server.tasks import TaskUpdater
 from a2a.types import (
     AgentCard,
+    DataPart,
     FilePart,
     FileWithBytes,
     FileWithUri,
     Part,
+    TaskNotCancelableError,
     TaskState,
     TextPart,
-    UnsupportedOperationError,
 )
 from a2a.utils.errors import ServerError
 
+from admission import AdmissionController
+from artifact_stream import ArtifactStream, streaming_run_config
+from blob_store import BlobStore
+from prerouter import PreRouter
+from status_updates import StatusUpdatePolicy
+from structured_output import StructuredOutput
+from task_store import TERMINAL_STATES
+from tracing import extract_context, tracer
+
 
 logger = logging.getLogger(__name__)
 
@@ -27,16 +43,36 @@ logger = logging.getLogger(__name__)
 class ADKAgentExecutor(AgentExecutor):
     """An AgentExecutor that runs an ADK agent."""
 
-    def __init__(self, runner: Runner, card: AgentCard):
+    def __init__(
+        self,
+        runner: Runner,
+        card: AgentCard,
+        status_policy: StatusUpdatePolicy | None = None,
+        prerouter: PreRouter | None = None,
+        admission: AdmissionController | None = None,
+        blobs: BlobStore | None = None,
+        output: StructuredOutput | None = None,
+    ):
         self.runner = runner
         self._card = card
-        self._running_sessions = {}
+        self.blobs = blobs or BlobStore(runner.artifact_service, runner.app_name, card.url)
+        self._status_policy = status_policy or StatusUpdatePolicy()
+        self._prerouter = prerouter
+        self._admission = admission or AdmissionController()
+        self._output = output
+        # Running request tasks by A2A task id, so they can be cancelled.
+        self._running_sessions: dict[str, asyncio.Task] = {}
 
     def _run_agent(
         self, session_id, new_message: types.Content
     ) -> AsyncGenerator[Event, None]:
         return self.runner.run_async(
-            session_id=session_id, user_id="self", new_message=new_message
+            session_id=session_id,
+            user_id="self",
+            new_message=new_message,
+            # A structured answer is of no use to the client until it is
+            # complete, so it is not streamed.
+            run_config=streaming_run_config() if self._output is None else RunConfig(),
         )
 
     async def _process_request(
@@ -49,30 +85,130 @@ class ADKAgentExecutor(AgentExecutor):
             session_id,
         )
         session_id = session.id
-        # Run through all events within the request.
-        async for event in self._run_agent(session_id, new_message):
-            if event.is_final_response():
-                parts = convert_genai_parts_to_a2a(event.content.parts)
-                logger.debug("✅ Yielding final response: %s", parts)
-                await task_updater.add_artifact(parts)
-                await task_updater.complete()
-                break
-            # If the agent is not making a function call, yield an update.
-            if not event.get_function_calls():
-                logger.debug("⏳ Yielding update response")
-                await task_updater.update_status(
-                    TaskState.working,
-                    message=task_updater.new_agent_message(
-                        convert_genai_parts_to_a2a(event.content.parts),
-                    ),
+        if await self._answer_directly(session, new_message, task_updater):
+            return
+        updates = self._status_policy.start(task_updater)
+        answer = ArtifactStream(task_updater)
+        try:
+            # Run through all events within the request.
+            async for event in self._run_agent(session_id, new_message):
+                if event.partial:
+                    # Streamed LLM output goes straight into the answer.
+                    await updates.flush()
+                    await answer.write(_text_of(event))
+                    continue
+                if event.is_final_response():
+                    parts = self._structure(
+                        await self._to_a2a(session_id, event.content.parts)
+                    )
+                    logger.debug("✅ Yielding final response: %s", parts)
+                    await updates.flush()
+                    await answer.finish(parts)
+                    await task_updater.complete()
+                    # The run ends with this event. It is not left early:
+                    # ADK ends its spans as its generators finish.
+                    continue
+                # If the agent is not making a function call, yield an update.
+                if not event.get_function_calls():
+                    logger.debug("⏳ Yielding update response")
+                    await updates.working(
+                        await self._to_a2a(
+                            session_id, event.content.parts if event.content else []
+                        )
+                    )
+                else:
+                    # Text streamed before a tool call is not the answer.
+                    logger.debug("➡️ Skipping event")
+                    answer.discard()
+        finally:
+            updates.close()
+
+    async def _receive(self, context: RequestContext) -> types.Content:
+        """
+        Converts the request message for ADK. Large files are stored as
+        artifacts and referred to, in the session and in the task's history.
+        """
+        parts = []
+        for position, a2a_part in enumerate(context.message.parts):
+            part = await self.blobs.offload(
+                context.context_id, convert_a2a_part_to_genai(a2a_part)
+            )
+            if part.file_data and a2a_part.root.kind == "file":
+                context.message.parts[position] = convert_genai_part_to_a2a(
+                    self.blobs.public_part(part)
                 )
-            else:
-                logger.debug("➡️ Skipping event")
+            parts.append(part)
+        return types.UserContent(parts=parts)
+
+    async def _to_a2a(self, session_id: str, parts: list[types.Part]) -> list[Part]:
+        """Converts `parts` for the client, sending large blobs as links."""
+        return convert_genai_parts_to_a2a(
+            [self.blobs.public_part(await self.blobs.offload(session_id, part)) for part in parts]
+        )
+
+    def _structure(self, parts: list[Part]) -> list[Part]:
+        """Sends the answer text as data if it matches the agent's schema."""
+        if self._output is None:
+            return parts
+        text = "".join(
+            part.text for part in (getattr(part, "root", part) for part in parts)
+            if isinstance(part, TextPart)
+        )
+        data = self._output.parse(text) if text else None
+        if data is None:
+            return parts
+        return [DataPart(data=data)] + [
+            part for part in parts if not isinstance(getattr(part, "root", part), TextPart)
+        ]
+
+    async def _answer_directly(
+        self, session: Session, new_message: types.Content, task_updater: TaskUpdater
+    ) -> bool:
+        """Answers the request through the pre-router if it has a route for it."""
+        if self._prerouter is None:
+            return False
+        text = " ".join(part.text for part in new_message.parts if part.text)
+        response = await self._prerouter.route(text)
+        if response is None:
+            return False
+        logger.debug("⚡ Answered without the LLM: %s", response)
+        # Record the exchange so that follow-up turns see it in the history.
+        invocation_id = new_invocation_context_id()
+        for event in (
+            Event(invocation_id=invocation_id, author="user", content=new_message),
+            Event(
+                invocation_id=invocation_id,
+                author=self.runner.agent.name,
+                content=types.ModelContent(parts=[types.Part(text=response)]),
+            ),
+        ):
+            await self.runner.session_service.append_event(session, event)
+        await task_updater.add_artifact(self._structure([TextPart(text=response)]))
+        await task_updater.complete()
+        return True
 
     async def execute(
         self,
         context: RequestContext,
         event_queue: EventQueue,
+    ):
+        # The request continues the caller's trace, if it sent one; the wait
+        # for a slot is part of it.
+        with tracer.start_as_current_span(
+            "a2a.execute",
+            context=extract_context(context.message.metadata if context.message else None),
+            kind=SpanKind.SERVER,
+            attributes={"a2a.agent": self._card.name, "a2a.task_id": context.task_id},
+        ):
+            # Wait for an execution slot, or reject the request before a task
+            # is created for it if the agent is overloaded.
+            async with self._admission.slot():
+                await self._execute(context, event_queue)
+
+    async def _execute(
+        self,
+        context: RequestContext,
+        event_queue: EventQueue,
     ):
         # Run the agent until either complete or the task is suspended.
         updater = TaskUpdater(event_queue, context.task_id, context.context_id)
@@ -80,19 +216,42 @@ class ADKAgentExecutor(AgentExecutor):
         if not context.current_task:
             await updater.submit()
         await updater.start_work()
-        await self._process_request(
-            types.UserContent(
-                parts=convert_a2a_parts_to_genai(context.message.parts),
-            ),
-            context.context_id,
-            updater,
+        # Run the request in its own task so that cancel() can stop the
+        # agent, including any LLM or MCP call it is waiting on.
+        request = asyncio.create_task(
+            self._process_request(
+                await self._receive(context),
+                context.context_id,
+                updater,
+            )
         )
+        self._running_sessions[context.task_id] = request
+        try:
+            await request
+        except asyncio.CancelledError:
+            # Either cancel() stopped the request and has reported the new
+            # state, or execute() itself was cancelled and the request must
+            # stop with it.
+            request.cancel()
+            logger.info("Task %s was cancelled", context.task_id)
+            if asyncio.current_task().cancelling():
+                raise
+        finally:
+            self._running_sessions.pop(context.task_id, None)
         logger.debug("--- 💵💱💶 [Currency] execute exiting ---")
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue):
-        """Cancel the task."""
-        # Ideally: kill any ongoing tasks.
-        raise ServerError(error=UnsupportedOperationError())
+        """Cancel the task, stopping the agent run if it is still going."""
+        if context.current_task and context.current_task.status.state in TERMINAL_STATES:
+            raise ServerError(error=TaskNotCancelableError())
+        # Report the new state before stopping the request: execute() closes
+        # the task's event queue as soon as the request ends. The request may
+        # already be gone if the client disconnected.
+        updater = TaskUpdater(event_queue, context.task_id, context.context_id)
+        await updater.update_status(TaskState.canceled, final=True)
+        request = self._running_sessions.pop(context.task_id, None)
+        if request is not None:
+            request.cancel()
 
     async def _upsert_session(self, session_id: str):
         """Upsert a session."""
@@ -103,6 +262,11 @@ class ADKAgentExecutor(AgentExecutor):
         )
 
 
+def _text_of(event: Event) -> str:
+    parts = event.content.parts if event.content else None
+    return "".join(part.text for part in parts or [] if part.text)
+
+
 def convert_a2a_parts_to_genai(parts: list[Part]) -> list[types.Part]:
     """Convert a list of A2A Part types into a list of Google Gen AI Part types."""
     return [convert_a2a_part_to_genai(part) for part in parts]
@@ -117,13 +281,17 @@ def convert_a2a_part_to_genai(part: Part) -> types.Part:
         if isinstance(part.file, FileWithUri):
             return types.Part(
                 file_data=types.FileData(
-                    file_uri=part.file.uri, mime_type=part.file.mime_type
+                    file_uri=part.file.uri,
+                    mime_type=part.file.mimeType,
+                    display_name=part.file.name,
                 )
             )
         if isinstance(part.file, FileWithBytes):
             return types.Part(
                 inline_data=types.Blob(
-                    data=part.file.bytes, mime_type=part.file.mime_type
+                    data=base64.b64decode(part.file.bytes),
+                    mime_type=part.file.mimeType,
+                    display_name=part.file.name,
                 )
             )
         raise ValueError(f"Unsupported file type: {type(part.file)}")
@@ -144,18 +312,22 @@ def convert_genai_part_to_a2a(part: types.Part) -> Part:
     if part.text:
         return TextPart(text=part.text)
     if part.file_data:
-        return FilePart(
-            file=FileWithUri(
-                uri=part.file_data.file_uri,
-                mime_type=part.file_data.mime_type,
+        return Part(
+            root=FilePart(
+                file=FileWithUri(
+                    uri=part.file_data.file_uri,
+                    mimeType=part.file_data.mime_type,
+                    name=part.file_data.display_name,
+                )
             )
         )
     if part.inline_data:
         return Part(
             root=FilePart(
                 file=FileWithBytes(
-                    bytes=part.inline_data.data,
-                    mime_type=part.inline_data.mime_type,
+                    bytes=base64.b64encode(part.inline_data.data).decode("ascii"),
+                    mimeType=part.inline_data.mime_type,
+                    name=part.inline_data.display_name,
                 )
             )
         )
@@ -0,0 +1,278 @@
+"""Prometheus metrics for the A2A agent services."""
+
+import inspect
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+
+LLM_CALLS = Counter(
+    "llm_calls_total",
+    "Number of completed LLM calls.",
+    ["agent", "model"],
+)
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds",
+    "Latency of LLM calls.",
+    ["agent", "model"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+LLM_TIER_CALLS = Counter(
+    "llm_tier_calls_total",
+    "LLM calls by model tier and the model serving it.",
+    ["tier", "model"],
+)
+LLM_TIER_LATENCY = Histogram(
+    "llm_tier_call_duration_seconds",
+    "Latency of LLM calls by model tier.",
+    ["tier"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+LLM_TIER_TOKENS = Counter(
+    "llm_tier_tokens_total",
+    "Tokens billed for LLM calls by model tier and kind (prompt or completion).",
+    ["tier", "kind"],
+)
+LLM_TIER_COST = Counter(
+    "llm_tier_cost_usd_total",
+    "Estimated cost of LLM calls in US dollars, by model tier and model.",
+    ["tier", "model"],
+)
+LLM_CACHE_EVENTS = Counter(
+    "llm_cache_events_total",
+    "Completion cache lookups by outcome (memory_hit, disk_hit or miss).",
+    ["event"],
+)
+BLOBS_OFFLOADED = Counter(
+    "agent_blobs_offloaded_total",
+    "Binary parts moved to the artifact service and passed on by reference.",
+)
+HISTORY_COMPACTIONS = Counter(
+    "history_tool_outputs_compacted_total",
+    "Old tool outputs replaced by a summary in the prompt sent to the LLM.",
+)
+TOOL_LATENCY = Histogram(
+    "agent_tool_call_duration_seconds",
+    "Latency of tool calls (MCP servers or remote agents) made by the agent.",
+    ["agent", "tool"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+TOOL_BATCH_SIZE = Histogram(
+    "agent_tool_call_batch_size",
+    "Number of tool calls from one LLM response that were run concurrently.",
+    buckets=(2, 3, 4, 6, 8, 12, 16),
+)
+TOOL_CALLS_IN_FLIGHT = Gauge(
+    "agent_tool_calls_in_flight",
+    "Number of tool calls the agent is currently waiting on.",
+    ["agent", "tool"],
+    multiprocess_mode="livesum",
+)
+ARTIFACT_CHUNKS = Counter(
+    "a2a_artifact_chunks_total",
+    "Answer artifact chunks sent to A2A clients.",
+)
+FIRST_CHUNK_SECONDS = Histogram(
+    "a2a_first_artifact_chunk_seconds",
+    "Time from the start of a run until the first chunk of its answer was sent.",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+STATUS_UPDATES = Counter(
+    "a2a_status_updates_total",
+    "Intermediate task status updates by outcome (sent, coalesced or dropped).",
+    ["outcome"],
+)
+STRUCTURED_ANSWERS = Counter(
+    "a2a_structured_answers_total",
+    "Final answers by whether they matched the agent's answer schema (valid or invalid).",
+    ["outcome"],
+)
+PREROUTED = Counter(
+    "prerouter_requests_total",
+    "Requests matched by the deterministic fast path, by route and outcome.",
+    ["route", "outcome"],
+)
+SESSIONS = Gauge(
+    "adk_sessions",
+    "Number of sessions held by the session service.",
+    multiprocess_mode="max",
+)
+SESSION_BYTES = Gauge(
+    "adk_session_bytes",
+    "Approximate size of the events held by the session service.",
+    multiprocess_mode="max",
+)
+SESSION_EVICTIONS = Counter(
+    "adk_session_evictions_total",
+    "Sessions dropped by the session service.",
+    ["reason"],
+)
+MCP_CONNECTION_EVENTS = Counter(
+    "mcp_connection_events_total",
+    "MCP server connection events (connected, failed or tools_changed).",
+    ["event"],
+)
+STARTUP_SECONDS = Gauge(
+    "agent_startup_seconds",
+    "Seconds from the entry point starting until the server was serving, and until the agent was ready.",
+    ["phase"],
+    multiprocess_mode="max",
+)
+ADMISSIONS = Counter(
+    "a2a_admissions_total",
+    "Tasks by admission outcome (admitted, queue_full or timeout).",
+    ["outcome"],
+)
+ADMISSION_QUEUE_SECONDS = Histogram(
+    "a2a_admission_queue_seconds",
+    "Time tasks waited for an execution slot.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30),
+)
+TASKS_QUEUED = Gauge(
+    "a2a_tasks_queued",
+    "Number of tasks waiting for an execution slot.",
+    multiprocess_mode="livesum",
+)
+TASKS_RUNNING = Gauge(
+    "a2a_tasks_running", "Number of tasks being executed.", multiprocess_mode="livesum"
+)
+TASKS = Gauge(
+    "a2a_tasks", "Number of tasks held by the task store.", multiprocess_mode="max"
+)
+
+# Start times keyed by invocation id (LLM calls) or function call id (tools).
+# The after-callbacks don't run for calls that fail or are cancelled; such
+# entries are dropped once MAX_STARTED newer calls have started.
+MAX_STARTED = 1024
+_llm_started: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_tool_started: OrderedDict[str, tuple[float, str, str]] = OrderedDict()
+# Gauges read from the session and task stores whenever metrics are scraped.
+_store_gauges: list[tuple[Gauge, Callable[[], float | Awaitable[float]]]] = []
+
+
+def _remember(started: OrderedDict, key: str, value: tuple) -> list[tuple]:
+    # Adds a start entry and returns the entries dropped to make room.
+    started[key] = value
+    started.move_to_end(key)
+    dropped = []
+    while len(started) > MAX_STARTED:
+        dropped.append(started.popitem(last=False)[1])
+    return dropped
+
+
+def before_model_callback(callback_context, llm_request) -> None:
+    """Records the start of an LLM call."""
+    _remember(
+        _llm_started,
+        callback_context.invocation_id,
+        (time.perf_counter(), llm_request.model or "unknown"),
+    )
+
+
+def after_model_callback(callback_context, llm_response) -> None:
+    """Records the end of an LLM call; partial streaming chunks are ignored."""
+    if llm_response.partial:
+        return
+    started = _llm_started.pop(callback_context.invocation_id, None)
+    if started is None:
+        return
+    start, model = started
+    LLM_CALLS.labels(agent=callback_context.agent_name, model=model).inc()
+    LLM_LATENCY.labels(agent=callback_context.agent_name, model=model).observe(
+        time.perf_counter() - start
+    )
+
+
+def tool_started(agent: str, tool: str, call_id: str) -> None:
+    """Records the start of a tool call."""
+    # A call that is started again, or dropped unfinished, is no longer in flight.
+    dropped = [_tool_started.pop(call_id)] if call_id in _tool_started else []
+    dropped += _remember(_tool_started, call_id, (time.perf_counter(), agent, tool))
+    TOOL_CALLS_IN_FLIGHT.labels(agent=agent, tool=tool).inc()
+    for _, dropped_agent, dropped_tool in dropped:
+        TOOL_CALLS_IN_FLIGHT.labels(agent=dropped_agent, tool=dropped_tool).dec()
+
+
+def tool_finished(call_id: str) -> None:
+    """Records the end of a tool call started with `tool_started`."""
+    started = _tool_started.pop(call_id, None)
+    if started is None:
+        return
+    start, agent, tool = started
+    TOOL_CALLS_IN_FLIGHT.labels(agent=agent, tool=tool).dec()
+    TOOL_LATENCY.labels(agent=agent, tool=tool).observe(time.perf_counter() - start)
+
+
+def before_tool_callback(tool, args, tool_context) -> None:
+    """Records the start of a tool call."""
+    tool_started(tool_context.agent_name, tool.name, tool_context.function_call_id)
+
+
+def after_tool_callback(tool, args, tool_context, tool_response) -> None:
+    """Records the end of a tool call."""
+    tool_finished(tool_context.function_call_id)
+
+
+def _count_sessions(session_service: Any) -> int:
+    return sum(
+        len(user_sessions)
+        for app_sessions in session_service.sessions.values()
+        for user_sessions in app_sessions.values()
+    )
+
+
+async def _count_tasks(task_store: Any) -> int:
+    if hasattr(task_store, "count"):
+        return await task_store.count()
+    return len(task_store.tasks)
+
+
+def watch_stores(session_service: Any, task_store: Any) -> None:
+    """Reports the session and task store sizes whenever metrics are scraped."""
+    # Sessions kept in a database are not counted.
+    if hasattr(session_service, "sessions"):
+        _store_gauges.append((SESSIONS, lambda: _count_sessions(session_service)))
+        _store_gauges.append(
+            (SESSION_BYTES, lambda: getattr(session_service, "total_bytes", 0))
+        )
+    _store_gauges.append((TASKS, lambda: _count_tasks(task_store)))
+
+
+def _registry() -> CollectorRegistry:
+    # With several uvicorn workers every worker writes its samples to
+    # PROMETHEUS_MULTIPROC_DIR and any of them can serve the aggregate.
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Serves the collected metrics in the Prometheus text format."""
+    for gauge, read in _store_gauges:
+        value = read()
+        if inspect.isawaitable(value):
+            value = await value
+        gauge.set(value)
+    return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+def add_metrics_route(app: Starlette) -> None:
+    """Exposes `/metrics` on an A2A FastAPI or Starlette application."""
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"])
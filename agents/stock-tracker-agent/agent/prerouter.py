@@ -0,0 +1,87 @@
+"""Deterministic fast path that answers fully structured requests without the LLM."""
+
+import json
+import logging
+import re
+from collections.abc import Callable
+from typing import Any
+
+from google.adk.tools.mcp_tool import MCPToolset
+
+from metrics import PREROUTED
+
+logger = logging.getLogger(__name__)
+
+# An ASIN as users write it ("B0CRXK7WVM", "ASIN B0CRXK7WVM", "ASIN = `B0CRXK7WVM`"),
+# captured as the `product_id` tool argument. The ASIN itself is case-sensitive.
+ASIN = r"(?:asin\s*[=:]?\s*)?[`'\"]?(?P<product_id>(?-i:B0[A-Z0-9]{8}|\d{9}[\dX]))[`'\"]?"
+
+
+class Route:
+    """
+    A request shape that maps to exactly one MCP tool call.
+
+    Args:
+        pattern (str): Regular expression that must match the whole request
+            (case-insensitive, surrounding whitespace and a trailing "?" or
+            "." ignored). Its named groups become the tool arguments.
+        tool (str): Name of the MCP tool to call.
+        render (callable): Builds the response from the match arguments and
+            the tool result. Returning None falls through to the LLM.
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        tool: str,
+        render: Callable[[dict[str, str], Any], dict | None],
+    ):
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.tool = tool
+        self.render = render
+
+    def match(self, text: str) -> dict[str, str] | None:
+        match = self.pattern.fullmatch(text.strip().rstrip("?.").strip())
+        if match is None:
+            return None
+        return match.groupdict()
+
+
+class PreRouter:
+    """
+    Answers requests that match one of `routes` with a direct tool call.
+
+    Anything that doesn't match a route exactly, or whose tool call fails or
+    returns nothing useful, is left to the LLM.
+    """
+
+    def __init__(self, toolset: MCPToolset, routes: list[Route]):
+        self.toolset = toolset
+        self.routes = routes
+
+    async def route(self, text: str) -> str | None:
+        """Returns the JSON response for `text`, or None to use the LLM."""
+        for route in self.routes:
+            args = route.match(text)
+            if args is None:
+                continue
+            try:
+                result = await self._call_tool(route.tool, args)
+                response = route.render(args, result) if result is not None else None
+            except Exception as e:
+                logger.warning("Fast path for %s failed: %s", route.tool, e)
+                response = None
+            PREROUTED.labels(
+                route=route.tool, outcome="answered" if response else "fallback"
+            ).inc()
+            return json.dumps(response, indent=2) if response else None
+        return None
+
+    async def _call_tool(self, name: str, args: dict[str, str]) -> Any:
+        tools = {tool.name: tool for tool in await self.toolset.get_tools()}
+        if name not in tools:
+            raise LookupError(f"MCP server has no tool named {name}")
+        response = await tools[name].run_async(args=args, tool_context=None)
+        if response.isError or not response.content:
+            return None
+        return json.loads(response.content[0].text)
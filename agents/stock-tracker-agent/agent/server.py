@@ -0,0 +1,95 @@
+"""Stock Tracker Agent A2A application."""
+
+import os
+
+from a2a.types import (
+    AgentCapabilities,
+    AgentCard,
+    AgentSkill,
+)
+from starlette.types import ASGIApp
+
+from startup import DeferredApp
+
+
+def create_agent_card(host: str, port: int) -> AgentCard:
+    """Describes the Stock Tracker agent served at `host`:`port`."""
+    stock_skill = AgentSkill(
+        id="get_product_stocks",
+        name="Get product stocks",
+        description="Can get the available stocks of a product given the ASIN",
+        tags=["Get Amazon available stocks"],
+        examples=["What is the availability of ASIN = B0CRXK7WVM?"]
+    )
+
+    return AgentCard(
+        name="Stock Tracker Agent",
+        description="Can get stock availability of products",
+        url=f"http://{host}:{port}/",
+        version="1.0.0",
+        defaultInputModes=["text"],
+        defaultOutputModes=["application/json", "text"],
+        capabilities=AgentCapabilities(streaming=True),
+        skills=[stock_skill],
+    )
+
+
+def build_app(agent_card: AgentCard) -> ASGIApp:
+    """Builds the A2A application; imports ADK, LiteLLM and the A2A server."""
+    from agent import prerouter, root_agent, structured_output, toolset
+    from agent_executor import ADKAgentExecutor
+    from blob_store import add_artifact_route
+    from metrics import add_metrics_route, watch_stores
+    from session_service import create_session_service
+    from task_store import SqliteTaskStore
+    from tracing import setup_tracing
+
+    from google.adk.artifacts import InMemoryArtifactService
+    from google.adk.memory import InMemoryMemoryService
+    from google.adk.runners import Runner
+
+    from a2a.server.apps import A2AFastAPIApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+
+    setup_tracing(agent_card.name)
+
+    artifact_service = InMemoryArtifactService()
+    session_service = create_session_service(artifact_service)
+    runner = Runner(
+        app_name=agent_card.name,
+        agent=root_agent,
+        artifact_service=artifact_service,
+        session_service=session_service,
+        memory_service=InMemoryMemoryService(),
+    )
+    agent_executor = ADKAgentExecutor(
+        runner, agent_card, prerouter=prerouter, output=structured_output
+    )
+
+    task_store = SqliteTaskStore()
+    request_handler = DefaultRequestHandler(
+        agent_executor=agent_executor,
+        task_store=task_store,
+    )
+
+    server = A2AFastAPIApplication(
+        agent_card=agent_card, http_handler=request_handler
+    )
+
+    app = server.build()
+    add_metrics_route(app)
+    add_artifact_route(app, agent_executor.blobs)
+    # Connect to the MCP server before the first request needs it.
+    app.add_event_handler("startup", toolset.start)
+    app.add_event_handler("shutdown", toolset.close)
+    watch_stores(session_service, task_store)
+    return app
+
+
+def create_app() -> DeferredApp:
+    """
+    Returns the application of one uvicorn worker, which is started from an
+    import string and finds its address in AGENT_HOST and AGENT_PORT.
+    """
+    agent_card = create_agent_card(os.environ["AGENT_HOST"], int(os.environ["AGENT_PORT"]))
+    return DeferredApp(lambda: build_app(agent_card), agent_card)
@@ -0,0 +1,259 @@
+"""Session services for the ADK runners."""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.artifacts import BaseArtifactService
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from metrics import SESSION_EVICTIONS
+
+logger = logging.getLogger(__name__)
+
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", 1000))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 3600))
+SESSION_MAX_EVENTS = int(os.getenv("SESSION_MAX_EVENTS", 200))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 256 * 1024 * 1024))
+# Keeps sessions in a database shared by all workers instead of in memory,
+# e.g. "sqlite:///sessions.sqlite3".
+SESSION_DB_URL = os.getenv("SESSION_DB_URL")
+
+_Key = tuple[str, str, str]
+
+
+class BoundedSessionService(InMemorySessionService):
+    """
+    An `InMemorySessionService` that keeps its memory use bounded.
+
+    Sessions are evicted least recently used first once there are more than
+    `max_sessions` of them or they hold more than `max_bytes` of events, and
+    any session idle for longer than `idle_ttl` seconds is dropped. Each
+    session keeps at most `max_events` events; older turns are trimmed at
+    user messages so that function calls and their responses stay together.
+    The artifacts of a session are deleted from `artifact_service` when the
+    session is evicted or deleted.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_COUNT,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_events: int = SESSION_MAX_EVENTS,
+        max_bytes: int = SESSION_MAX_BYTES,
+        artifact_service: Optional[BaseArtifactService] = None,
+    ):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.artifact_service = artifact_service
+        # Stored sessions from least to most recently used, with their
+        # last access time and approximate size in bytes.
+        self._usage: OrderedDict[_Key, list[float]] = OrderedDict()
+        self.total_bytes = 0
+        # Dropped sessions whose artifacts are still to be deleted.
+        self._dropped: list[_Key] = []
+
+    def _touch(self, key: _Key) -> None:
+        usage = self._usage.get(key)
+        if usage is None:
+            usage = self._usage[key] = [0.0, 0]
+        usage[0] = time.monotonic()
+        self._usage.move_to_end(key)
+
+    def _forget(self, key: _Key) -> None:
+        usage = self._usage.pop(key, None)
+        if usage is not None:
+            self.total_bytes -= usage[1]
+
+    def _drop_artifacts(self, key: _Key) -> None:
+        if self.artifact_service is not None:
+            self._dropped.append(key)
+
+    async def _delete_artifacts(self) -> None:
+        # Sessions are dropped in synchronous code, so their artifacts are
+        # deleted by the asynchronous call that dropped them.
+        while self._dropped:
+            app_name, user_id, session_id = self._dropped.pop()
+            filenames = await self.artifact_service.list_artifact_keys(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+            for filename in filenames:
+                # Artifacts in the user namespace are shared by all sessions
+                # of the user.
+                if filename.startswith("user:"):
+                    continue
+                await self.artifact_service.delete_artifact(
+                    app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+                )
+
+    def _evict(self, reason: str, key: _Key) -> None:
+        app_name, user_id, session_id = key
+        user_sessions = self.sessions.get(app_name, {}).get(user_id, {})
+        user_sessions.pop(session_id, None)
+        if not user_sessions:
+            self.sessions.get(app_name, {}).pop(user_id, None)
+        self._forget(key)
+        self._drop_artifacts(key)
+        SESSION_EVICTIONS.labels(reason=reason).inc()
+        logger.debug("Evicted session %s (%s)", session_id, reason)
+
+    def _enforce_limits(self) -> None:
+        # The most recently used session is the one being served, so it is
+        # never evicted here.
+        expired_before = time.monotonic() - self.idle_ttl
+        while len(self._usage) > 1:
+            key, (accessed_at, _) = next(iter(self._usage.items()))
+            if accessed_at > expired_before:
+                break
+            self._evict("idle", key)
+        while len(self._usage) > 1 and (
+            len(self._usage) > self.max_sessions or self.total_bytes > self.max_bytes
+        ):
+            self._evict("capacity", next(iter(self._usage)))
+
+    def _trim_events(self, key: _Key, session: Session) -> None:
+        excess = len(session.events) - self.max_events
+        if excess <= 0:
+            return
+        # Cut at the first user message that leaves at most max_events, so
+        # the kept history starts at a complete turn.
+        for start in range(excess, len(session.events)):
+            if session.events[start].author == "user":
+                break
+        else:
+            return
+        trimmed = session.events[:start]
+        del session.events[:start]
+        self._add_bytes(key, -sum(_event_size(event) for event in trimmed))
+
+    def _add_bytes(self, key: _Key, size: int) -> None:
+        usage = self._usage.get(key)
+        if usage is not None:
+            usage[1] += size
+            self.total_bytes += size
+
+    def _create_session_impl(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = super()._create_session_impl(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        self._forget(key)
+        self._touch(key)
+        self._enforce_limits()
+        return session
+
+    def _get_session_impl(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        usage = self._usage.get(key)
+        if usage is not None and usage[0] <= time.monotonic() - self.idle_ttl:
+            self._evict("idle", key)
+            return None
+        session = super()._get_session_impl(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is not None and usage is not None:
+            self._touch(key)
+        return session
+
+    def _delete_session_impl(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        super()._delete_session_impl(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        self._forget((app_name, user_id, session_id))
+        self._drop_artifacts((app_name, user_id, session_id))
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        await self._delete_artifacts()
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        await self._delete_artifacts()
+        return session
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        await self._delete_artifacts()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        key = (session.app_name, session.user_id, session.id)
+        stored = self.sessions.get(key[0], {}).get(key[1], {}).get(key[2])
+        if stored is None or event.partial:
+            return event
+        self._touch(key)
+        self._add_bytes(key, _event_size(event))
+        self._trim_events(key, stored)
+        self._enforce_limits()
+        await self._delete_artifacts()
+        return event
+
+
+def create_session_service(
+    artifact_service: Optional[BaseArtifactService] = None,
+) -> BaseSessionService:
+    """
+    Returns the session service configured by the environment: a
+    `DatabaseSessionService` when SESSION_DB_URL is set, so that several
+    worker processes see the same conversations, and a
+    `BoundedSessionService` that deletes the artifacts of dropped sessions
+    from `artifact_service` otherwise.
+    """
+    if not SESSION_DB_URL:
+        return BoundedSessionService(artifact_service=artifact_service)
+    from google.adk.sessions import DatabaseSessionService
+    from sqlalchemy.exc import OperationalError
+
+    kwargs = {}
+    if SESSION_DB_URL.startswith("sqlite"):
+        # Wait for other workers' writes instead of failing on a locked file.
+        kwargs["connect_args"] = {"timeout": 30}
+    try:
+        return DatabaseSessionService(SESSION_DB_URL, **kwargs)
+    except OperationalError:
+        # Another worker created the tables at the same moment.
+        return DatabaseSessionService(SESSION_DB_URL, **kwargs)
+
+
+def _event_size(event: Event) -> int:
+    return len(event.model_dump_json(exclude_none=True))
@@ -0,0 +1,179 @@
+"""Startup of the agent services: serve first, import the heavy stack in the background."""
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Callable
+
+from a2a.types import AgentCard
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from metrics import STARTUP_SECONDS, metrics_endpoint
+
+logger = logging.getLogger(__name__)
+
+STARTUP_WAIT_TIMEOUT = float(os.getenv("STARTUP_WAIT_TIMEOUT", 30))
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", 1))
+
+# Namespace packages are reported one level deeper ("google.adk", "google.genai").
+_NAMESPACE_PACKAGES = {"google"}
+
+_started = time.perf_counter()
+
+
+class DeferredApp:
+    """
+    An ASGI app that serves at once and builds the real A2A app in the background.
+
+    `build` runs in a worker thread once the server starts, so importing
+    ADK, LiteLLM and the A2A server no longer delays listening. Until it
+    returns, the agent card and `/metrics` are answered directly and other
+    requests wait up to `wait_timeout` seconds for the app before getting a
+    503. The lifespan of the built app is run as soon as it exists. If the
+    build fails the server shuts down.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], ASGIApp],
+        agent_card: AgentCard,
+        wait_timeout: float = STARTUP_WAIT_TIMEOUT,
+    ):
+        self.build = build
+        self.wait_timeout = wait_timeout
+        self.agent_card = agent_card
+        self._early = {
+            "/.well-known/agent.json": self._agent_card_endpoint,
+            "/metrics": metrics_endpoint,
+        }
+        self._app: ASGIApp | None = None
+        self._ready = asyncio.Event()
+        self._lifespan_messages: asyncio.Queue = asyncio.Queue()
+        self._lifespan_replies: asyncio.Queue = asyncio.Queue()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(scope, receive, send)
+            return
+        if self._app is None:
+            early = self._early.get(scope["path"]) if scope["type"] == "http" else None
+            if early is not None:
+                response = await early(Request(scope, receive))
+                await response(scope, receive, send)
+                return
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.wait_timeout)
+            except TimeoutError:
+                response = Response("Agent is starting", status_code=503, headers={"Retry-After": "1"})
+                await response(scope, receive, send)
+                return
+        await self._app(scope, receive, send)
+
+    async def _agent_card_endpoint(self, request: Request) -> Response:
+        return JSONResponse(self.agent_card.model_dump(mode="json", exclude_none=True))
+
+    async def _lifespan(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await receive()
+        STARTUP_SECONDS.labels(phase="serving").set(time.perf_counter() - _started)
+        building = asyncio.create_task(self._build(scope))
+        await send({"type": "lifespan.startup.complete"})
+        await receive()
+        await asyncio.gather(building, return_exceptions=True)
+        if self._app is not None:
+            await self._lifespan_step({"type": "lifespan.shutdown"})
+        await send({"type": "lifespan.shutdown.complete"})
+
+    async def _build(self, scope: Scope) -> None:
+        try:
+            app = await asyncio.to_thread(self.build)
+            asyncio.create_task(
+                app(scope, self._lifespan_messages.get, self._lifespan_replies.put)
+            )
+            reply = await self._lifespan_step({"type": "lifespan.startup"})
+            if reply["type"] != "lifespan.startup.complete":
+                raise RuntimeError(reply.get("message") or "application startup failed")
+        except Exception:
+            logger.exception("Failed to start the agent")
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+        self._app = app
+        self._ready.set()
+        STARTUP_SECONDS.labels(phase="ready").set(time.perf_counter() - _started)
+        logger.info("Agent ready after %.2fs", time.perf_counter() - _started)
+
+    async def _lifespan_step(self, message: dict) -> dict:
+        await self._lifespan_messages.put(message)
+        return await self._lifespan_replies.get()
+
+
+def run_workers(host: str, port: int, workers: int) -> None:
+    """
+    Serves `server:create_app` from `workers` uvicorn worker processes.
+
+    Tasks are already kept in a SQLite file every worker can open; sessions
+    are moved to a shared SQLite database as well unless SESSION_DB_URL
+    names another one, so any worker can continue any conversation. Metrics
+    are aggregated across workers through PROMETHEUS_MULTIPROC_DIR.
+
+    Not shared: the event queues of running tasks, the executors' handles
+    on them and the artifact service holding offloaded files stay in the
+    worker that runs the task. Cancelling a task, resubscribing to its
+    stream and downloading its files only work when the request reaches
+    that worker, which uvicorn doesn't arrange. If clients need them, run
+    single-worker instances behind a proxy that routes by context id.
+    """
+    import uvicorn
+
+    logger.warning(
+        "Serving from %d workers: task cancellation, resubscription and file "
+        "downloads only work on the worker that runs the task",
+        workers,
+    )
+
+    os.environ.update(AGENT_HOST=host, AGENT_PORT=str(port))
+    os.environ.setdefault("SESSION_DB_URL", "sqlite:///sessions.sqlite3")
+    os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="agent-metrics-")
+    )
+    uvicorn.run("server:create_app", factory=True, host=host, port=port, workers=workers)
+
+
+def import_report(modules: list[str], top: int = 15) -> str:
+    """
+    Imports `modules` in a fresh interpreter under `-X importtime` and
+    returns the time spent per top-level package, slowest first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    packages: dict[str, int] = defaultdict(int)
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        parts = name.strip().split(".")
+        package = ".".join(parts[:2] if parts[0] in _NAMESPACE_PACKAGES else parts[:1])
+        packages[package] += int(self_us)
+        total += int(self_us)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    lines = [f"{'package':<32}{'seconds':>10}{'share':>8}"]
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"{package:<32}{us / 1e6:>10.3f}{us / total:>8.1%}")
+    lines.append(f"{'total':<32}{total / 1e6:>10.3f}")
+    return "\n".join(lines)
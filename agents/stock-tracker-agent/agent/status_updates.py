@@ -0,0 +1,105 @@
+"""Coalescing and rate limiting of intermediate A2A task status updates."""
+
+import asyncio
+import os
+import time
+
+from a2a.server.tasks import TaskUpdater
+from a2a.types import Part, TaskState, TextPart
+
+from metrics import STATUS_UPDATES
+
+STATUS_COALESCE_WINDOW = float(os.getenv("STATUS_COALESCE_WINDOW", 0.25))
+STATUS_MAX_RATE = float(os.getenv("STATUS_MAX_RATE", 4))
+STATUS_DROP_EMPTY = os.getenv("STATUS_DROP_EMPTY", "true").lower() in ("1", "true")
+
+
+class StatusUpdatePolicy:
+    """
+    How intermediate `working` updates are sent to clients.
+
+    Updates arriving within `window` seconds of the first unsent one are
+    merged into a single status message, at most `max_rate` messages are
+    sent per second, and updates without any content are dropped when
+    `drop_empty` is set. A window of 0 and a rate of 0 send every update
+    as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        window: float = STATUS_COALESCE_WINDOW,
+        max_rate: float = STATUS_MAX_RATE,
+        drop_empty: bool = STATUS_DROP_EMPTY,
+    ):
+        self.window = window
+        self.min_interval = 1 / max_rate if max_rate > 0 else 0.0
+        self.drop_empty = drop_empty
+
+    def start(self, task_updater: TaskUpdater) -> "StatusUpdates":
+        """Returns the update stream for one task."""
+        return StatusUpdates(self, task_updater)
+
+
+class StatusUpdates:
+    """Intermediate status updates of one task, sent according to a policy."""
+
+    def __init__(self, policy: StatusUpdatePolicy, task_updater: TaskUpdater):
+        self._policy = policy
+        self._updater = task_updater
+        self._pending: list[Part] = []
+        self._pending_since = 0.0
+        self._last_sent = float("-inf")
+        self._timer: asyncio.Task | None = None
+
+    async def working(self, parts: list[Part]) -> None:
+        """Queues a `working` update with `parts` as its message."""
+        if self._policy.drop_empty and _is_empty(parts):
+            STATUS_UPDATES.labels(outcome="dropped").inc()
+            return
+        if self._pending:
+            STATUS_UPDATES.labels(outcome="coalesced").inc()
+        else:
+            self._pending_since = time.monotonic()
+        self._pending.extend(parts)
+
+        due = max(
+            self._pending_since + self._policy.window,
+            self._last_sent + self._policy.min_interval,
+        )
+        delay = due - time.monotonic()
+        if delay <= 0:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Sends the queued update now, if there is one."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        parts, self._pending = self._pending, []
+        self._last_sent = time.monotonic()
+        STATUS_UPDATES.labels(outcome="sent").inc()
+        await self._updater.update_status(
+            TaskState.working, message=self._updater.new_agent_message(parts)
+        )
+
+    def close(self) -> None:
+        """Discards any queued update."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = []
+
+
+def _is_empty(parts: list[Part]) -> bool:
+    # The converters return either `Part` or the bare part types.
+    roots = [getattr(part, "root", part) for part in parts]
+    return all(isinstance(root, TextPart) and not root.text.strip() for root in roots)
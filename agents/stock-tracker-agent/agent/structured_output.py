@@ -0,0 +1,58 @@
+"""
+Structured answers for A2A clients.
+
+An agent describes its answer with a pydantic model. Every LLM call asks for
+JSON of that shape through the OpenAI response format (tool calls are still
+allowed), and the final answer is validated against the model and sent as
+an A2A `DataPart`, so the host gets the data itself instead of JSON in a
+fenced block of text.
+"""
+
+import logging
+import re
+from typing import Any, Optional
+
+from litellm.utils import type_to_response_format_param
+from pydantic import BaseModel, ValidationError
+
+from metrics import STRUCTURED_ANSWERS
+
+logger = logging.getLogger(__name__)
+
+# Models that ignore the response format still tend to fence their JSON.
+_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+class StructuredOutput:
+    """
+    The answer schema of an agent.
+
+    Args:
+        schema (type[BaseModel]): The model the final answer must match.
+    """
+
+    def __init__(self, schema: type[BaseModel]):
+        self.schema = schema
+        self._response_format = type_to_response_format_param(schema)
+
+    def before_model_callback(self, callback_context, llm_request) -> None:
+        """Asks the model to answer in the agent's schema."""
+        # LiteLlm sends the request's response schema as `response_format`.
+        # Assigning it skips the genai validation, which only knows Gemini
+        # schemas.
+        llm_request.config.response_schema = self._response_format
+
+    def parse(self, text: str) -> Optional[dict[str, Any]]:
+        """
+        The answer in `text` as validated data, or None if it doesn't match
+        the schema and has to be sent as text.
+        """
+        fenced = _FENCE.match(text)
+        try:
+            answer = self.schema.model_validate_json(fenced.group(1) if fenced else text)
+        except ValidationError as e:
+            logger.warning("Answer does not match %s: %s", self.schema.__name__, e)
+            STRUCTURED_ANSWERS.labels(outcome="invalid").inc()
+            return None
+        STRUCTURED_ANSWERS.labels(outcome="valid").inc()
+        return answer.model_dump(mode="json")
@@ -0,0 +1,105 @@
+"""
+Serves the price-scraper, review-analyser and stock-tracker tools from one
+process.
+
+All tools are available on the combined `/mcp` endpoint, and each server is
+still mounted under its own prefix (`/price-scraper/mcp`, `/review-analyser/mcp`
+and `/stock-tracker/mcp`) for clients that point at a single server. The
+three servers import the same `upstream` module, so they share one response
+cache, one rate limiter and one HTTP connection pool.
+"""
+import contextlib
+import importlib.util
+import os
+import sys
+
+from fastmcp import FastMCP
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+SERVERS = ["price-scraper", "review-analyser", "stock-tracker"]
+SERVERS_ROOT = os.getenv(
+    "SERVERS_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+load_dotenv()
+port = os.getenv('PORT', 8080)
+workers = int(os.getenv('WORKERS', 1))
+
+# upstream.py, metrics.py, tracing.py and archive.py are the same in every server
+# directory; putting one of them on the path makes all three servers use
+# a single copy of each. It goes last so that `server` still resolves to
+# this module in uvicorn workers, which inherit the path.
+sys.path.append(os.path.join(SERVERS_ROOT, SERVERS[0]))
+
+from metrics import metrics_endpoint
+from tracing import setup_tracing
+from upstream import warm_cache_from_archive
+
+# Installed before the servers are loaded, so their spans carry this
+# process's service name.
+setup_tracing("amazon-scrapers")
+
+def _load_server(name: str):
+    module_name = name.replace("-", "_") + "_server"
+    spec = importlib.util.spec_from_file_location(
+        module_name, os.path.join(SERVERS_ROOT, name, "server.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module.mcp
+
+servers = {name: _load_server(name) for name in SERVERS}
+
+mcp = FastMCP("amazon-scrapers", host="0.0.0.0", port=port)
+mcp.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+for server in servers.values():
+    mcp.mount(server)
+
+def create_app():
+    """
+    Builds the ASGI app with the combined endpoint at `/mcp` and each
+    server's own endpoints under `/<server-name>`.
+
+    In multi-worker mode MCP sessions are kept per process, so every
+    endpoint runs in stateless mode and any worker can serve any request.
+    """
+    stateless = workers > 1
+    apps = {
+        name: server.http_app(transport="streamable-http", stateless_http=stateless)
+        for name, server in servers.items()
+    }
+    combined = mcp.http_app(transport="streamable-http", stateless_http=stateless)
+
+    # Each streamable-http app runs its session manager in its lifespan,
+    # which Starlette doesn't start for mounted apps.
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with contextlib.AsyncExitStack() as stack:
+            for sub_app in [combined, *apps.values()]:
+                await stack.enter_async_context(sub_app.lifespan(sub_app))
+            yield
+
+    routes = [Mount(f"/{name}", app=sub_app) for name, sub_app in apps.items()]
+    routes.append(Mount("/", app=combined))
+    return Starlette(routes=routes, lifespan=lifespan)
+
+if __name__ == "__main__":
+    import uvicorn
+    warm_cache_from_archive()
+    if workers > 1:
+        import tempfile
+        os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="amazon-scrapers-metrics-")
+        )
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            host="0.0.0.0",
+            port=int(port),
+            workers=workers,
+        )
+    else:
+        uvicorn.run(create_app(), host="0.0.0.0", port=int(port))
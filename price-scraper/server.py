@@ -1,8 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 from fastmcp import FastMCP
-import requests
 from dotenv import load_dotenv
 import os
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from metrics import metrics_endpoint, track_tool
+from tracing import in_current_context, setup_tracing, trace_tool
+from upstream import prefetch as prefetch_upstream
+from upstream import query as query_upstream
+from upstream import warm_cache_from_archive
 
 load_dotenv()
 rapid_api_key = os.getenv('RAPID_API_KEY')
@@ -11,37 +17,144 @@ if not rapid_api_key:
 port = os.getenv('PORT', 8081)
 if not port:
     ValueError("PORT is not found.")
+workers = int(os.getenv('WORKERS', 1))
+prefetch_top_n = int(os.getenv('PREFETCH_TOP_N', 0))
 
 mcp = FastMCP("price-scraper", host="0.0.0.0", port=port)
+mcp.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+setup_tracing("price-scraper")
+
+DEFAULT_DOMAIN = "com"
+DEFAULT_PRODUCT_GEO = "90210"
+DEFAULT_SEARCH_GEO = "60607"
+
+# Regional lookups run concurrently; upstream.query keeps them under the
+# shared rate limit.
+_region_pool = ThreadPoolExecutor(max_workers=int(os.getenv('REGION_WORKERS', 8)))
+
+def _product_payload(product_id: str, geo_location: Optional[str], domain: Optional[str] = None) -> Dict:
+    payload = {
+        "source": "amazon_product",
+        "query": product_id,
+        "parse": True
+    }
+    if geo_location:
+        payload["geo_location"] = geo_location
+    if domain:
+        payload["domain"] = domain
+    return payload
+
+def _search_payload(query: str, geo_location: Optional[str], domain: str) -> Dict:
+    payload = {
+        "source": "amazon_search",
+        "query": query,
+        "domain": domain,
+        "parse": True
+    }
+    if geo_location:
+        payload["geo_location"] = geo_location
+    return payload
+
+def _product_content(product_id: str, geo_location: Optional[str], domain: Optional[str] = None) -> Dict:
+    data = query_upstream(_product_payload(product_id, geo_location, domain))
+    return data.get("results", [{}])[0].get("content", {})
+
+def _organic_results(query: str, geo_location: Optional[str], domain: str) -> List[Dict]:
+    data = query_upstream(_search_payload(query, geo_location, domain))
+    return (
+        data.get("results", [{}])[0]
+        .get("content", {})
+        .get("results", {})
+        .get("organic", [])
+    )
+
+def _regions(geo_locations: Optional[List[str]], domains: Optional[List[str]], default_geo: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Expands the requested marketplaces and locations into (domain, geo) pairs.
+
+    The default US location only makes sense on amazon.com, so other
+    marketplaces fall back to the API's own default when no location is given.
+    """
+    regions = []
+    for domain in domains or [DEFAULT_DOMAIN]:
+        if geo_locations:
+            geos = geo_locations
+        elif domain == DEFAULT_DOMAIN:
+            geos = [default_geo]
+        else:
+            geos = [None]
+        regions.extend((domain, geo) for geo in geos)
+    return regions
+
+def _comparison_table(regions: List[Tuple[str, Optional[str]]], fetch: Callable[[str, Optional[str]], List[Dict]]) -> Dict:
+    """
+    Fetches every region concurrently and merges the items into one table.
+
+    Returns:
+        dict: 'columns' ('asin', 'title', then one price column per region),
+              'currency' (currency per region column), and 'rows' (one per ASIN).
+    """
+    def fetch_region(region):
+        try:
+            return fetch(*region)
+        except Exception as e:
+            print(f"Error occurred for region {region}: {e}")
+            return []
+
+    labels = [domain if geo is None else f"{domain}:{geo}" for domain, geo in regions]
+    currency = {}
+    rows = {}
+    # Each region runs in a copy of this thread's context to stay in its trace.
+    futures = [_region_pool.submit(in_current_context(fetch_region), region) for region in regions]
+    for index, items in enumerate(future.result() for future in futures):
+        for item in items:
+            asin = item.get("asin")
+            if not asin:
+                continue
+            row = rows.setdefault(asin, [asin, item.get("title")] + [None] * len(regions))
+            row[1] = row[1] or item.get("title")
+            row[2 + index] = item.get("price")
+            if item.get("currency"):
+                currency.setdefault(labels[index], item.get("currency"))
+    return {
+        "columns": ["asin", "title"] + labels,
+        "currency": currency,
+        "rows": list(rows.values())
+    }
 
 @mcp.tool()
-def get_product_price(product_id: str) -> Dict:
+@trace_tool("get_product_price")
+@track_tool("get_product_price")
+def get_product_price(product_id: str, geo_locations: Optional[List[str]] = None, domains: Optional[List[str]] = None) -> Dict:
     """
     Fetches the price and title of a product from Amazon using its ASIN.
 
+    Pass `geo_locations` and/or `domains` to compare the price across
+    delivery locations and Amazon marketplaces in a single call.
+
     Args:
         product_id (str): The ASIN of the product.
+        geo_locations (list, optional): Delivery postal codes, e.g. ["90210", "10001"].
+        domains (list, optional): Amazon marketplace domains, e.g. ["com", "co.uk", "de"].
 
     Returns:
         dict: Dictionary containing 'asin', 'title', and 'price' if found, else None.
+              With `geo_locations` or `domains`, a comparison table with
+              'columns', 'currency' and 'rows' (one price column per region).
     """
-    url = "https://amazon-data-scraper-api3.p.rapidapi.com/queries"
-    payload = {
-        "source": "amazon_product",
-        "query": product_id,
-        "geo_location": "90210",
-        "parse": True
-    }
-    headers = {
-        "x-rapidapi-key": rapid_api_key,
-        "x-rapidapi-host": "amazon-data-scraper-api3.p.rapidapi.com",
-        "Content-Type": "application/json"
-    }
+    if geo_locations or domains:
+        def fetch(domain, geo_location):
+            content = _product_content(product_id, geo_location, domain)
+            return [{
+                "asin": product_id,
+                "title": content.get("title"),
+                "price": content.get("price"),
+                "currency": content.get("currency")
+            }]
+        return _comparison_table(_regions(geo_locations, domains, DEFAULT_PRODUCT_GEO), fetch)
+
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        product_info = data.get("results", [{}])[0].get("content", {})
+        product_info = _product_content(product_id, DEFAULT_PRODUCT_GEO)
         title = product_info.get("title")
         price = product_info.get("price")
         if title is not None and price is not None:
@@ -56,40 +169,35 @@ def get_product_price(product_id: str) -> Dict:
         return None
 
 @mcp.tool()
-def search_amazon_products(query: str) -> List[Dict]:
+@trace_tool("search_amazon_products")
+@track_tool("search_amazon_products")
+def search_amazon_products(query: str, geo_locations: Optional[List[str]] = None, domains: Optional[List[str]] = None) -> Union[List[Dict], Dict]:
     """
     Searches Amazon for products matching the query string.
 
+    Pass `geo_locations` and/or `domains` to compare the results across
+    delivery locations and Amazon marketplaces in a single call.
+
     Args:
         query (str): The search term.
+        geo_locations (list, optional): Delivery postal codes, e.g. ["60607", "10001"].
+        domains (list, optional): Amazon marketplace domains, e.g. ["com", "co.uk", "de"].
 
     Returns:
         list: List of dictionaries, each containing 'asin', 'title', 'price', 'url', and 'image'.
+              With `geo_locations` or `domains`, a comparison table with
+              'columns', 'currency' and 'rows' (one row per ASIN, one price
+              column per region).
     """
-    url = "https://amazon-data-scraper-api3.p.rapidapi.com/queries"
-    payload = {
-        "source": "amazon_search",
-        "query": query,
-        "geo_location": "60607",
-        "domain": "com",
-        "parse": True
-    }
-    headers = {
-        "x-rapidapi-key": rapid_api_key,
-        "x-rapidapi-host": "amazon-data-scraper-api3.p.rapidapi.com",
-        "Content-Type": "application/json"
-    }
+    if geo_locations or domains:
+        return _comparison_table(
+            _regions(geo_locations, domains, DEFAULT_SEARCH_GEO),
+            lambda domain, geo_location: _organic_results(query, geo_location, domain)
+        )
+
     results = []
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        organic_products = (
-            data.get("results", [{}])[0]
-            .get("content", {})
-            .get("results", {})
-            .get("organic", [])
-        )
+        organic_products = _organic_results(query, DEFAULT_SEARCH_GEO, DEFAULT_DOMAIN)
         for item in organic_products:
             results.append({
                 "asin": item.get("asin"),
@@ -98,10 +206,42 @@ def search_amazon_products(query: str) -> List[Dict]:
                 "url": "https://www.amazon.com" + item.get("url", ""),
                 "image": item.get("url_image")
             })
+        # The agents almost always ask for the details of the top results
+        # next, so warm those in the background.
+        if prefetch_top_n > 0:
+            prefetch_upstream([
+                _product_payload(item["asin"], DEFAULT_PRODUCT_GEO)
+                for item in results[:prefetch_top_n]
+                if item["asin"]
+            ])
         return results
     except Exception as e:
         print(f"Error occurred: {e}")
         return []
 
+def create_app():
+    """
+    Builds the ASGI app served by each uvicorn worker in multi-worker mode.
+
+    MCP sessions are kept per process, so the app runs in stateless mode and
+    any worker can serve any request.
+    """
+    return mcp.http_app(transport="streamable-http", stateless_http=True)
+
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
\ No newline at end of file
+    warm_cache_from_archive()
+    if workers > 1:
+        import tempfile
+        import uvicorn
+        os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="price-scraper-metrics-")
+        )
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            host="0.0.0.0",
+            port=int(port),
+            workers=workers,
+        )
+    else:
+        mcp.run(transport="streamable-http")
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Tracing of tool calls and upstream requests.
+
+Spans are recorded only when TRACE_FILE (one JSON object per line, the
+format the agents write too) or OTEL_EXPORTER_OTLP_ENDPOINT is set. A tool
+call continues the trace of the agent that made it: the agent sends its
+W3C trace context in the `_meta` of the `tools/call` request.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional, Sequence
+
+from fastmcp.server.dependencies import get_context
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanLimits, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+TRACE_ATTRIBUTE_LIMIT = int(os.getenv("TRACE_ATTRIBUTE_LIMIT", 1024))
+
+tracer = trace.get_tracer("mcp-server")
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(span_record(span), default=str) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as file:
+                file.write(lines)
+        except OSError as e:
+            logger.warning("Could not write spans to %s: %s", self.path, e)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def span_record(span: ReadableSpan) -> Dict:
+    """The JSON form of a finished span, with times in seconds since the epoch."""
+    return {
+        "trace_id": format(span.context.trace_id, "032x"),
+        "span_id": format(span.context.span_id, "016x"),
+        "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+        "name": span.name,
+        "kind": span.kind.name,
+        "service": span.resource.attributes.get("service.name"),
+        "start": span.start_time / 1e9,
+        "end": span.end_time / 1e9,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+    }
+
+
+def setup_tracing(service_name: str) -> None:
+    """
+    Installs the span exporters; does nothing if none is configured or a
+    server loaded earlier in this process has installed them already.
+    """
+    if not TRACE_FILE and not OTLP_ENDPOINT:
+        return
+    if isinstance(trace.get_tracer_provider(), TracerProvider):
+        return
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        span_limits=SpanLimits(max_span_attribute_length=TRACE_ATTRIBUTE_LIMIT),
+    )
+    if TRACE_FILE:
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(TRACE_FILE)))
+    if OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning(
+                "OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp is not installed"
+            )
+        else:
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+def inject_context(carrier: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Adds the current trace context to `carrier` (e.g. HTTP headers) and returns it."""
+    carrier = {} if carrier is None else carrier
+    propagate.inject(carrier)
+    return carrier
+
+
+def _caller_context() -> Optional[Context]:
+    # The trace context the agent sent in the `_meta` of the tool call.
+    try:
+        meta = get_context().request_context.meta
+    except (LookupError, RuntimeError, ValueError):
+        return None
+    if meta is None:
+        return None
+    return propagate.extract(meta.model_dump())
+
+
+def trace_tool(name: str):
+    """
+    Decorator that records a tool call as a span of the caller's trace.
+
+    Like `track_tool`, the wrapped function keeps its signature, so it can
+    be registered with `mcp.tool()` as usual.
+
+    Args:
+        name (str): The tool name used in the span name.
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(
+                f"mcp.tool {name}",
+                context=_caller_context(),
+                kind=trace.SpanKind.SERVER,
+                attributes={"mcp.tool": name},
+            ):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def in_current_context(function: Callable) -> Callable:
+    """
+    Wraps `function` to run in a copy of the calling thread's context, so
+    work handed to a thread pool stays in the current trace.
+    """
+    context = contextvars.copy_context()
+    return functools.partial(context.run, function)
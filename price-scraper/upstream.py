@@ -0,0 +1,308 @@
+"""
+Client for the Amazon Data Scraper API on RapidAPI.
+
+Every call goes through a response cache, a single-flight lease and a token
+bucket rate limiter. All three live in one SQLite database, so uvicorn
+workers (and other servers on the same node pointing at the same file) share
+them and never fetch the same query twice or exceed the quota together.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from opentelemetry import trace
+
+from archive import Archive
+from metrics import CACHE_EVENTS, PREFETCHES, UPSTREAM_LATENCY
+from tracing import inject_context, tracer
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://amazon-data-scraper-api3.p.rapidapi.com/queries"
+API_HOST = "amazon-data-scraper-api3.p.rapidapi.com"
+
+STATE_PATH = os.getenv(
+    "UPSTREAM_STATE_PATH",
+    os.path.join(tempfile.gettempdir(), "amazon-scraper-state.sqlite3"),
+)
+CACHE_TTL = float(os.getenv("UPSTREAM_CACHE_TTL", 600))
+CACHE_MAX_ENTRIES = int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", 10000))
+RATE_LIMIT = float(os.getenv("UPSTREAM_RATE_LIMIT", 5))
+RATE_LIMIT_BURST = float(os.getenv("UPSTREAM_RATE_LIMIT_BURST", 10))
+FLIGHT_TIMEOUT = float(os.getenv("UPSTREAM_FLIGHT_TIMEOUT", 30))
+REQUEST_TIMEOUT = float(os.getenv("UPSTREAM_REQUEST_TIMEOUT", 30))
+PREFETCH_BUDGET = float(os.getenv("UPSTREAM_PREFETCH_BUDGET", 30))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")
+OFFLINE = os.getenv("UPSTREAM_OFFLINE", "").lower() in ("1", "true")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at);
+CREATE TABLE IF NOT EXISTS flights (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SharedState:
+    """
+    Cache, single-flight leases and rate-limit buckets stored in SQLite.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    readers never block the single writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Returns the cached value for `key`, or None if missing or expired."""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict, ttl: float) -> None:
+        """Stores `value` and evicts expired and least recently used entries."""
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now),
+        )
+        evicted = conn.execute(
+            "DELETE FROM cache WHERE expires_at <= ? OR key IN ("
+            "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (now, CACHE_MAX_ENTRIES),
+        ).rowcount
+        if evicted > 0:
+            CACHE_EVENTS.labels(event="eviction").inc(evicted)
+
+    def acquire_flight(self, key: str, timeout: float) -> bool:
+        """Takes the single-flight lease for `key` unless a live one exists."""
+        now = time.time()
+        return self._connection().execute(
+            "INSERT INTO flights VALUES (?, ?) ON CONFLICT (key) DO UPDATE "
+            "SET expires_at = excluded.expires_at WHERE flights.expires_at <= ?",
+            (key, now + timeout, now),
+        ).rowcount == 1
+
+    def release_flight(self, key: str) -> None:
+        self._connection().execute("DELETE FROM flights WHERE key = ?", (key,))
+
+    def take_token(self, name: str, rate: float, burst: float) -> float:
+        """
+        Takes one token from the named bucket.
+
+        Returns:
+            float: 0 if a token was taken, else the seconds to wait before retrying.
+        """
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if wait == 0.0:
+                tokens -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+_state = SharedState(STATE_PATH)
+_session = requests.Session()
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+_archive = Archive(ARCHIVE_DIR) if ARCHIVE_DIR else None
+
+
+def cache_key(payload: Dict) -> str:
+    """Builds a stable cache key for an API payload."""
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def _wait_for_token() -> None:
+    if RATE_LIMIT <= 0:
+        return
+    with tracer.start_as_current_span("upstream.rate_limit"):
+        while (wait := _state.take_token("upstream", RATE_LIMIT, RATE_LIMIT_BURST)) > 0:
+            time.sleep(wait)
+
+
+def _fetch(payload: Dict) -> Dict:
+    if OFFLINE:
+        record = _archive.latest(payload) if _archive is not None else None
+        if record is None:
+            raise LookupError(f"No archived response for {payload}")
+        return record["response"]
+
+    headers = {
+        "x-rapidapi-key": os.getenv("RAPID_API_KEY"),
+        "x-rapidapi-host": API_HOST,
+        "Content-Type": "application/json",
+    }
+    _wait_for_token()
+    with (
+        tracer.start_as_current_span(
+            "upstream.fetch",
+            kind=trace.SpanKind.CLIENT,
+            attributes={"http.url": API_URL, "upstream.source": payload["source"]},
+        ) as span,
+        UPSTREAM_LATENCY.labels(source=payload["source"]).time(),
+    ):
+        response = _session.post(
+            API_URL, json=payload, headers=inject_context(headers), timeout=REQUEST_TIMEOUT
+        )
+        span.set_attribute("http.status_code", response.status_code)
+    response.raise_for_status()
+    data = response.json()
+    if _archive is not None:
+        _archive.append(payload, data)
+    return data
+
+
+def query(payload: Dict) -> Dict:
+    """
+    Sends a query to the API, serving it from the shared cache when possible.
+
+    Concurrent identical queries from any worker are coalesced: one of them
+    fetches while the others wait for its result to appear in the cache.
+
+    Args:
+        payload (dict): The request body for the `/queries` endpoint.
+
+    Returns:
+        dict: The parsed JSON response.
+    """
+    with tracer.start_as_current_span(
+        "upstream.query",
+        attributes={"upstream.source": payload["source"], "upstream.query": str(payload.get("query"))},
+    ) as span:
+        return _query(payload, span)
+
+
+def _query(payload: Dict, span: trace.Span) -> Dict:
+    key = cache_key(payload)
+    deadline = time.monotonic() + FLIGHT_TIMEOUT
+    leased = False
+    try:
+        while True:
+            cached = _state.get(key)
+            if cached is not None:
+                CACHE_EVENTS.labels(event="hit").inc()
+                span.set_attribute("upstream.cache", "hit")
+                return cached
+            # We hold the lease and the cache is still empty: fetch it here.
+            if leased:
+                break
+            leased = _state.acquire_flight(key, FLIGHT_TIMEOUT)
+            if not leased:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+
+        CACHE_EVENTS.labels(event="miss").inc()
+        span.set_attribute("upstream.cache", "miss")
+        data = _fetch(payload)
+        _state.put(key, data, CACHE_TTL)
+        return data
+    finally:
+        if leased:
+            _state.release_flight(key)
+
+
+@tracer.start_as_current_span("upstream.prefetch")
+def _prefetch_one(payload: Dict) -> None:
+    if _state.get(cache_key(payload)) is not None:
+        PREFETCHES.labels(outcome="cached").inc()
+        return
+    # The budget is a separate bucket refilled at PREFETCH_BUDGET per minute,
+    # shared by all workers, so speculative fetches can't eat the quota.
+    if _state.take_token("prefetch", PREFETCH_BUDGET / 60, PREFETCH_BUDGET) > 0:
+        PREFETCHES.labels(outcome="over_budget").inc()
+        return
+    try:
+        query(payload)
+        PREFETCHES.labels(outcome="fetched").inc()
+    except Exception as e:
+        PREFETCHES.labels(outcome="failed").inc()
+        logger.warning("Prefetch of %s failed: %s", payload.get("query"), e)
+
+
+def prefetch(payloads: List[Dict]) -> None:
+    """
+    Warms the cache for `payloads` in the background.
+
+    Payloads that are already cached are skipped, and the rest are fetched
+    only while the prefetch budget (UPSTREAM_PREFETCH_BUDGET per minute) lasts.
+
+    Args:
+        payloads (list): Request bodies for the `/queries` endpoint.
+    """
+    if PREFETCH_BUDGET <= 0:
+        return
+    for payload in payloads:
+        _prefetch_pool.submit(_prefetch_one, payload)
+
+
+def warm_cache_from_archive() -> int:
+    """
+    Loads archived responses that are younger than the cache TTL into the cache.
+
+    Returns:
+        int: The number of responses loaded.
+    """
+    if _archive is None:
+        return 0
+    now = time.time()
+    warmed = 0
+    for record in _archive.records(since=now - CACHE_TTL):
+        _state.put(cache_key(record["payload"]), record["response"], record["ts"] + CACHE_TTL - now)
+        warmed += 1
+    logger.info("Warmed %d cache entries from %s", warmed, ARCHIVE_DIR)
+    return warmed
@@ -0,0 +1,66 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of requests to the Amazon Data Scraper API.",
+    ["source"],
+)
+CACHE_EVENTS = Counter(
+    "upstream_cache_events_total",
+    "Upstream response cache lookups and evictions.",
+    ["event"],
+)
+PREFETCHES = Counter(
+    "upstream_prefetches_total",
+    "Background cache warm-ups by outcome.",
+    ["outcome"],
+)
+TOOL_CALLS_IN_FLIGHT = Gauge(
+    "mcp_tool_calls_in_flight",
+    "Number of MCP tool calls currently being served.",
+    ["tool"],
+    multiprocess_mode="livesum",
+)
+
+
+def track_tool(name: str):
+    """
+    Decorator that counts a tool function as in flight while it runs.
+
+    The wrapped function keeps its original signature, so it can be
+    registered with `mcp.tool()` as usual.
+
+    Args:
+        name (str): The tool name used as the metric label.
+    """
+    return TOOL_CALLS_IN_FLIGHT.labels(tool=name).track_inprogress()
+
+
+def _registry() -> CollectorRegistry:
+    # With several uvicorn workers every worker writes its samples to
+    # PROMETHEUS_MULTIPROC_DIR and any of them can serve the aggregate.
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """
+    Serves the collected metrics in the Prometheus text format.
+    """
+    return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -1,9 +1,13 @@
 from fastmcp import FastMCP
-import requests
 from dotenv import load_dotenv
 import os
 from typing import Dict, List
 
+from metrics import metrics_endpoint, track_tool
+from tracing import setup_tracing, trace_tool
+from upstream import query as query_upstream
+from upstream import warm_cache_from_archive
+
 load_dotenv()
 rapid_api_key = os.getenv('RAPID_API_KEY')
 if not rapid_api_key:
@@ -11,10 +15,15 @@ if not rapid_api_key:
 port = os.getenv('PORT', 8082)
 if not port:
     ValueError("PORT is not found.")
+workers = int(os.getenv('WORKERS', 1))
 
 mcp = FastMCP("review-analyser", host="0.0.0.0", port=port)
+mcp.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+setup_tracing("review-analyser")
 
 @mcp.tool()
+@trace_tool("get_product_reviews")
+@track_tool("get_product_reviews")
 def get_product_reviews(product_id: str) -> List[Dict]:
     """
     Fetches reviews for a given Amazon product using the RapidAPI Amazon Data Scraper.
@@ -26,22 +35,15 @@ def get_product_reviews(product_id: str) -> List[Dict]:
         List[Dict]: A list of dictionaries, each containing review details such as
             'asin', 'title', 'rating', and 'content'.
     """
-    url = "https://amazon-data-scraper-api3.p.rapidapi.com/queries"
     payload = {
         "source": "amazon_product",
         "query": product_id,
         "geo_location": "90210",
         "parse": True
     }
-    headers = {
-        "x-rapidapi-key": "59b2bf441emsh3d2d32af0263a80p195f9cjsn7b69606cc48f",
-        "x-rapidapi-host": "amazon-data-scraper-api3.p.rapidapi.com",
-        "Content-Type": "application/json"
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    data = response.json()
     reviews = []
     try:
+        data = query_upstream(payload)
         reviews_list = (
             data.get("results", [{}])[0]
             .get("content", {})
@@ -58,5 +60,29 @@ def get_product_reviews(product_id: str) -> List[Dict]:
         pass
     return reviews
 
+def create_app():
+    """
+    Builds the ASGI app served by each uvicorn worker in multi-worker mode.
+
+    MCP sessions are kept per process, so the app runs in stateless mode and
+    any worker can serve any request.
+    """
+    return mcp.http_app(transport="streamable-http", stateless_http=True)
+
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
\ No newline at end of file
+    warm_cache_from_archive()
+    if workers > 1:
+        import tempfile
+        import uvicorn
+        os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="review-analyser-metrics-")
+        )
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            host="0.0.0.0",
+            port=int(port),
+            workers=workers,
+        )
+    else:
+        mcp.run(transport="streamable-http")
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+Append-only archive of raw Amazon Data Scraper API responses.
+
+Records are written to numbered segment files, one zstd frame per record,
+so any record can be decompressed on its own. A fixed-width index maps
+(key, timestamp) to (segment, offset, length); the key is the ASIN for
+product queries and a digest of the payload for everything else. Both the
+index and the segments are read through mmap, which keeps lookups and bulk
+scans cheap without loading the archive into memory.
+
+Usage:
+    python archive.py scan [--asin ASIN] [--since EPOCH_SECONDS]
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import zstandard
+
+# key, timestamp (ms), segment number, offset, length
+_INDEX_ENTRY = struct.Struct("<16sqIQI")
+_SEGMENT_NAME = "segment-{:06d}.zst"
+
+
+def archive_key(payload: Dict) -> bytes:
+    """Returns the 16-byte index key for an API payload."""
+    if payload.get("source") == "amazon_product":
+        return payload["query"].encode("ascii", "replace")[:16].ljust(16, b"\0")
+    return hashlib.blake2b(
+        json.dumps(payload, sort_keys=True).encode("utf-8"), digest_size=16
+    ).digest()
+
+
+class _Mapping:
+    """A read-only mmap of a file that is remapped when the file grows."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self.map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def view(self) -> memoryview:
+        # The view holds on to the map it was taken from, so a remap by
+        # another thread doesn't pull it away from a running read.
+        with self._lock:
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if size != self.size:
+                # The old map is left to the garbage collector: open memoryviews
+                # from a running scan may still point into it.
+                self.map = None
+                if size:
+                    with open(self.path, "rb") as f:
+                        self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.size = size
+            return memoryview(self.map) if self.map is not None else memoryview(b"")
+
+
+class Archive:
+    """
+    Writer and reader for a response archive directory.
+
+    Appends are serialised with an exclusive file lock, so several worker
+    processes can share one archive directory.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, level: int = 3):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.level = level
+        # zstd contexts must not be shared between threads.
+        self._zstd = threading.local()
+        self._lock = threading.Lock()
+        self._index = _Mapping(os.path.join(directory, "index.bin"))
+        self._segments: Dict[int, _Mapping] = {}
+        # The segment appends go to; found from the directory on first use.
+        self._segment: Optional[int] = None
+        # Positions of each key's records, filled in from the index as it grows.
+        self._positions: Dict[bytes, List[Tuple[int, int, int, int]]] = {}
+        self._indexed = 0
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        if not hasattr(self._zstd, "compressor"):
+            self._zstd.compressor = zstandard.ZstdCompressor(level=self.level)
+        return self._zstd.compressor
+
+    def _decompressor(self) -> zstandard.ZstdDecompressor:
+        if not hasattr(self._zstd, "decompressor"):
+            self._zstd.decompressor = zstandard.ZstdDecompressor()
+        return self._zstd.decompressor
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, _SEGMENT_NAME.format(number))
+
+    def _current_segment(self) -> int:
+        # Called with the file lock held. Other processes may have started
+        # newer segments since, so full ones are skipped.
+        if self._segment is None:
+            numbers = [
+                int(name[8:14])
+                for name in os.listdir(self.directory)
+                if name.startswith("segment-") and name.endswith(".zst")
+            ]
+            self._segment = max(numbers, default=1)
+        path = self._segment_path(self._segment)
+        while os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+        return self._segment
+
+    def append(self, payload: Dict, response: Dict, timestamp: Optional[float] = None) -> None:
+        """
+        Archives one raw response.
+
+        Args:
+            payload (dict): The request body that produced the response.
+            response (dict): The raw JSON response.
+            timestamp (float, optional): Fetch time in epoch seconds; defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        frame = self._compressor().compress(json.dumps({
+            "ts": timestamp,
+            "payload": payload,
+            "response": response,
+        }).encode("utf-8"))
+        with self._lock, open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            number = self._current_segment()
+            with open(self._segment_path(number), "ab") as segment:
+                offset = segment.tell()
+                segment.write(frame)
+            with open(self._index.path, "ab") as index:
+                index.write(_INDEX_ENTRY.pack(
+                    archive_key(payload), int(timestamp * 1000), number, offset, len(frame)
+                ))
+
+    def _entries(self) -> Iterator[Tuple[bytes, int, int, int, int]]:
+        view = self._index.view()
+        # Ignore a trailing entry that another process is still writing.
+        usable = len(view) - len(view) % _INDEX_ENTRY.size
+        return _INDEX_ENTRY.iter_unpack(view[:usable])
+
+    def _read(self, number: int, offset: int, length: int) -> Dict:
+        with self._lock:
+            mapping = self._segments.get(number)
+            if mapping is None:
+                mapping = self._segments[number] = _Mapping(self._segment_path(number))
+        view = mapping.view()
+        if offset + length > len(view):
+            raise ValueError(f"Archive segment {number} is shorter than its index")
+        return json.loads(self._decompressor().decompress(view[offset:offset + length]))
+
+    def records(self, key: Optional[bytes] = None, since: float = 0) -> Iterator[Dict]:
+        """
+        Yields archived records in write order.
+
+        Args:
+            key (bytes, optional): Only yield records with this index key.
+            since (float): Only yield records fetched at or after this epoch time.
+        """
+        since_ms = int(since * 1000)
+        for entry_key, ts, number, offset, length in self._entries():
+            if ts >= since_ms and (key is None or entry_key == key):
+                yield self._read(number, offset, length)
+
+    def _refresh_positions(self) -> None:
+        with self._lock:
+            view = self._index.view()
+            usable = len(view) - len(view) % _INDEX_ENTRY.size
+            for key, ts, number, offset, length in _INDEX_ENTRY.iter_unpack(view[self._indexed:usable]):
+                self._positions.setdefault(key, []).append((ts, number, offset, length))
+            self._indexed = usable
+
+    def latest(self, payload: Dict) -> Optional[Dict]:
+        """Returns the newest record fetched with exactly `payload`, if any."""
+        self._refresh_positions()
+        for _, number, offset, length in reversed(self._positions.get(archive_key(payload), [])):
+            record = self._read(number, offset, length)
+            if record["payload"] == payload:
+                return record
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect a raw response archive.")
+    parser.add_argument("command", choices=["scan"])
+    parser.add_argument("--dir", default=os.getenv("ARCHIVE_DIR", "archive"))
+    parser.add_argument("--asin")
+    parser.add_argument("--since", type=float, default=0)
+    args = parser.parse_args()
+
+    archive = Archive(args.dir)
+    key = archive_key({"source": "amazon_product", "query": args.asin}) if args.asin else None
+    for record in archive.records(key=key, since=args.since):
+        sys.stdout.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
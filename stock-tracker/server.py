@@ -1,9 +1,13 @@
 from fastmcp import FastMCP
-import requests
 from dotenv import load_dotenv
 import os
 from typing import Dict
 
+from metrics import metrics_endpoint, track_tool
+from tracing import setup_tracing, trace_tool
+from upstream import query as query_upstream
+from upstream import warm_cache_from_archive
+
 load_dotenv()
 rapid_api_key = os.getenv('RAPID_API_KEY')
 if not rapid_api_key:
@@ -11,10 +15,15 @@ if not rapid_api_key:
 port = os.getenv('PORT', 8083)
 if not port:
     ValueError("PORT is not found.")
+workers = int(os.getenv('WORKERS', 1))
 
 mcp = FastMCP("price-scraper", host="0.0.0.0", port=port)
+mcp.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+setup_tracing("stock-tracker")
 
 @mcp.tool()
+@trace_tool("get_product_stock")
+@track_tool("get_product_stock")
 def get_product_stock(product_id: str) -> Dict:
     """
     Fetches stock information for a given Amazon product ID (ASIN).
@@ -26,20 +35,13 @@ def get_product_stock(product_id: str) -> Dict:
         Dict: A dictionary containing the ASIN, product title, and stock status.
               Returns None if the information cannot be retrieved or parsed.
     """
-    url = "https://amazon-data-scraper-api3.p.rapidapi.com/queries"
     payload = {
         "source": "amazon_product",
         "query": product_id,
         "geo_location": "90210",
         "parse": True
     }
-    headers = {
-        "x-rapidapi-key": rapid_api_key,
-        "x-rapidapi-host": "amazon-data-scraper-api3.p.rapidapi.com",
-        "Content-Type": "application/json"
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    data = response.json()
+    data = query_upstream(payload)
     try:
         product_info = data.get("results", [{}])[0].get("content", {})
         title = product_info.get('title')
@@ -52,5 +54,29 @@ def get_product_stock(product_id: str) -> Dict:
     except Exception:
         return None
     
+def create_app():
+    """
+    Builds the ASGI app served by each uvicorn worker in multi-worker mode.
+
+    MCP sessions are kept per process, so the app runs in stateless mode and
+    any worker can serve any request.
+    """
+    return mcp.http_app(transport="streamable-http", stateless_http=True)
+
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
\ No newline at end of file
+    warm_cache_from_archive()
+    if workers > 1:
+        import tempfile
+        import uvicorn
+        os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="stock-tracker-metrics-")
+        )
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            host="0.0.0.0",
+            port=int(port),
+            workers=workers,
+        )
+    else:
+        mcp.run(transport="streamable-http")
\ No newline at end of file